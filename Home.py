@@ -1,156 +1,128 @@
 import streamlit as st
-import requests
-from bs4 import BeautifulSoup
-import pandas as pd
-import re
-import math
-import time
-from sqlalchemy import create_engine, text
-from dashboards import product_brand_insights, customer_satisfaction
+import importlib
+import os
+import json
 from login import login_page
-from db import get_engine
+
+# Only streamlit and the login page load at startup. The dashboards (pandas,
+# plotly, scipy) are imported the first time their page is opened, the
+# database and job queue when Home is, and the scraper when a crawl is
+# submitted; Python keeps each module loaded for every later rerun and
+# session on this server process. See benchmarks/bench_startup.py.
 
 st.set_page_config(layout="wide", page_title='Web Scraping')
 
+# Crawls run as queued jobs on crawler workers (see crawler.py and the
+# Procfile). Unless EMBEDDED_CRAWLER=0, one worker thread also runs inside
+# this process, started with the first job, so a single-dyno deployment
+# still processes its jobs.
+@st.cache_resource
+def _embedded_crawler():
+    from crawler import Crawler
+    from db import get_engine
+    crawler=Crawler(get_engine(), workers=1, poll=2.0)
+    crawler.start()
+    return crawler
+
+def embedded_crawler():
+    if os.getenv('EMBEDDED_CRAWLER', '1') != '0':
+        _embedded_crawler()
+
+def run_report(job):
+    # where the run's time went, and which selectors matched nothing
+    if not job.get('report') or job['report'] == 'null':
+        return
+    import pandas as pd
+    from scraper.metrics import prometheus
+    report=json.loads(job['report'])
+    with st.expander('Run report'):
+        c1, c2, c3=st.columns(3)
+        stages=pd.DataFrame([{'stage': stage, **values} for stage, values in report['stages'].items()])
+        c1.markdown('**Stage timings (s)**')
+        c1.dataframe(stages, hide_index=True)
+        c2.markdown('**Counters**')
+        c2.dataframe(pd.Series(report['counters'], name='value'))
+        c3.markdown('**Cards missing each field**')
+        c3.dataframe(pd.Series(report['missing'], name='missing'))
+        d1, d2=st.columns(2)
+        d1.download_button('Download JSON', json.dumps(report, indent=2), f"crawl_job_{job['id']}.json",
+                           'application/json')
+        d2.download_button('Download Prometheus', prometheus(report), f"crawl_job_{job['id']}.prom", 'text/plain')
+
+def job_status(job_id):
+    from db import get_engine
+    from storage.jobs import get_job, QUEUED, RUNNING, FAILED
+    from streamlit_autorefresh import st_autorefresh
+    job=get_job(get_engine(), job_id)
+    if job is None:
+        return
+    run_report(job)
+    if job['status'] in (QUEUED, RUNNING):
+        embedded_crawler()
+        st_autorefresh(interval=2000, key=f"job_{job_id}")
+        if job['status'] == QUEUED:
+            st.info(f"Job {job_id} is queued for a crawler worker...")
+        else:
+            st.text(f"🕸️ Scraping page {job['pages'] + 1}...")
+            st.success(f"Total products scraped so far: {job['products']}")
+        return
+    if job['status'] == FAILED:
+        st.error(f"Error: {job['message']}")
+        return
+    if st.session_state.get('refreshed_job') != job_id:
+        # dashboards served by this process pick up the new rows at once
+        from dashboards import data
+        data.invalidate()
+        st.session_state['refreshed_job']=job_id
+    if job['message']:
+        st.warning(f"Stopped at {job['message']}. The {job['products']} products saved before it are kept.")
+    if not job['products']:
+        st.error("Scraped DataFrame is Empty")
+        return
+    st.success(f"Saved to database: {job['inserted']} new products, {job['updated']} updated, "
+               f"{job['changes']} price/stock changes recorded, "
+               f"{job['skipped']} duplicates across searches skipped")
+    report=json.loads(job['report']) if job.get('report') else None
+    left_early=report['counters'].get('searches_left_early') if report else None
+    if left_early:
+        st.info(f"Searches left early after pages with only products found by earlier searches: {left_early}")
+
 def home():
+    from db import get_engine
+    from storage.jobs import submit_job, recent_jobs
+    from storage.engine import pool_metrics
     st.title('FLIPKART SCRAPER')
-    url=st.text_input('Enter Flipkart Search URL:')
+    # one search URL or keywords per line; several lines run as one batch
+    # that writes each product once however many searches find it
+    queries=st.text_area('Enter Flipkart Search URLs or keywords (one per line):')
+    offline=st.checkbox('Replay from cache (no requests)')
     if st.button('🚀Start Scraping'):
         try:
-            headers={ "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36 Edg/142.0.0.0"}
-
-            product_list=[]
-            page=1
-
-            progress_text = st.empty()
-            total_products_text = st.empty()
-            while True:
-                progress_text.text(f"🕸️ Scraping page {page}...")
-                if "page=" in url:
-                    base_url = re.sub(r'page=\d+', f'page={page}', url)
-                else:
-                    base_url = url + f"&page={page}"
-                source=requests.get(base_url, headers=headers, timeout=30)
-                source.raise_for_status()
-
-                soup=BeautifulSoup(source.text, 'html.parser')
-                main_container=soup.find('div', class_='QSCKDh dLgFEE')
-                product=main_container.find_all('div', class_='jIjQ8S') if main_container else []
-
-                if not product:
-                    break
-
-                for p in product:
-                    name=p.find('div', class_='RG5Slk') 
-                    price_tag=p.find('div', class_='hZ3P6w DeU9vF')
-                    clean_price = None
-                    if price_tag:
-                        price_text = price_tag.get_text(strip=True)
-                        clean_price = ( price_text.replace('₹', '').replace(',', '') ).strip()
-
-                    rating=p.find('div', class_='MKiFS6')
-
-                    link_tag=p.find('a', href=True)
-                    product_id=None
-                    product_url=None
-                    if link_tag:
-                        product_url = "https://www.flipkart.com" + link_tag['href']
-                        match = re.search(r'/p/(\w+)', link_tag['href'])
-                        if match:
-                            product_id = match.group(1)
-
-                    discount = None
-                    discount_tag = p.find('div', class_='HQe8jr')
-                    if discount_tag:
-                        discount_text = discount_tag.get_text(strip=True)
-                        match = re.search(r'(\d+)', discount_text)
-                        if match:
-                            discount = int(match.group(1))
-
-                    brand_name = None
-                    if name:
-                        name_text = name.get_text(strip=True)
-                        n_parts=name_text.split()
-                        if len(n_parts)>0:
-                            brand_name=n_parts[0].lower()
-
-                    stock_tag = p.find('div', class_='HZ0E6r Rm9_cy')  
-                    stock = 'In Stock'
-                    if stock_tag:
-                        stock_text = stock_tag.get_text(strip=True)
-                        if "Only" in stock_text and "left" in stock_text:
-                            stock = stock_tag.get_text(strip=True)
-
-                    ratings_reviews_tag = p.find('span', class_='PvbNMB') 
-                    ratings_count = None
-                    if ratings_reviews_tag:
-                        ratings_text = ratings_reviews_tag.get_text(strip=True)
-                        r_parts = ratings_text.split('&')  
-                        if len(r_parts) >= 1:
-                            ratings_count = r_parts[0].split()[0]
-
-                    product_list.append({
-                        'Product ID': product_id,
-                        'Product Name':name.get_text(strip=True) if name else None,
-                        'Brand':brand_name,
-                        'Price':clean_price,
-                        'Discount': discount,
-                        'Availability':stock,
-                        'Rating':rating.get_text(strip=True) if rating else None,
-                        'Number of Ratings': ratings_count
-                    })
-                page+=1
-                time.sleep(3)
-            total_products_text.success(f"Total products scraped so far: {len(product_list)}")
-
-            raw_data=pd.DataFrame(product_list)
-            st.dataframe(raw_data)
-
-            engine = get_engine()
-        
-            st.session_state["scraped_data"] = raw_data
-
-            if raw_data.empty:
-                st.error("Scraped DataFrame is Empty")
-                return
-
-        # Dataset Exploration
-            # raw_data.head()
-            # raw_data.shape
-            # raw_data.columns
-            # raw_data.duplicated().sum()
-            # raw_data.isnull().sum()
-            # raw_data.Brand.nunique()
-            # raw_data.dtypes
-
-            # raw_data.loc[raw_data['Discount']<0, :]
-            
-
-        # Data Cleaning
-            raw_data.columns=raw_data.columns.str.strip().str.lower().str.replace(' ', '_')
+            lines=[line.strip() for line in queries.splitlines() if line.strip()]
+            st.session_state['job_id']=submit_job(get_engine(), '\n'.join(lines), offline)
+            embedded_crawler()
+        except Exception as e:
+            st.error(f"Error: {e}")
 
-            raw_data['price']=pd.to_numeric(raw_data['price'], errors='coerce')
-            raw_data['rating']=pd.to_numeric(raw_data['rating'], errors='coerce')
-            raw_data['number_of_ratings'] = (raw_data['number_of_ratings']
-                                                .astype(str)
-                                                .str.replace(',', '', regex=False)
-                                                .str.strip()
-                                                .replace(['nan', 'None', ''], None)
-                                                .astype('Int64')
-                                            )
-            raw_data['discount']=raw_data['discount'].fillna(0)
-            raw_data.drop_duplicates(inplace=True, ignore_index=True)
-            raw_data.insert(0,'record_id', range(1, len(raw_data) + 1))
+    if 'job_id' in st.session_state:
+        job_status(st.session_state['job_id'])
 
-            raw_data.to_sql('scraped_cleandata', con=engine, if_exists='replace', index=False)
+    with st.expander('Recent crawl jobs'):
+        st.dataframe(recent_jobs(get_engine()), hide_index=True)
+    with st.expander('Database connections'):
+        # checked-out connections and time spent waiting for one
+        st.json(pool_metrics(get_engine()))
 
-        except Exception as e:
-            st.error(f"Error: {e}")
+def lazy_page(module):
+    # the page's render(), imported only once the page is selected
+    def render():
+        importlib.import_module(module).render()
+    return render
 
 dashboards_dict={
     'Home':home,
-    'Product & Brand Insights': product_brand_insights.render,
-    'Customer Satisfaction Analysis': customer_satisfaction.render
+    'Product & Brand Insights': lazy_page('dashboards.product_brand_insights'),
+    'Customer Satisfaction Analysis': lazy_page('dashboards.customer_satisfaction')
 }
 if st.session_state.get("logged_in", False):
     page=st.sidebar.radio("Go to", list(dashboards_dict.keys()))
@@ -0,0 +1,32 @@
+# Cleaning time for raw extracted rows: per-card build_record() plus the
+# pandas clean_products() block versus the vectorised normalize_raw().
+# Run from the repository root:  python -m benchmarks.bench_clean
+import argparse
+import time
+import pandas as pd
+from benchmarks.fixtures import raw_frame
+from scraper.extract import build_record
+from scraper.clean import clean_products, normalize_raw
+
+
+def per_card(raw):
+    return clean_products(pd.DataFrame([build_record(row, row['href']) for row in raw.to_dict('records')]))
+
+
+def run(rows):
+    raw=raw_frame(rows)
+    results=[]
+    for name, clean in [('per-card + pandas', per_card), ('normalize_raw', normalize_raw)]:
+        start=time.perf_counter()
+        clean(raw)
+        elapsed=time.perf_counter() - start
+        results.append({'path': name, 'rows': rows, 'seconds': round(elapsed, 3), 'rows_per_sec': round(rows / elapsed)})
+    return results
+
+
+if __name__ == '__main__':
+    parser=argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    args=parser.parse_args()
+    for row in run(args.rows):
+        print(f"{row['path']:>18}  {row['rows']} rows  {row['seconds']:>8.3f}s  {row['rows_per_sec']:>12,} rows/s")
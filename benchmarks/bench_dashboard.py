@@ -0,0 +1,49 @@
+# Seconds the dashboards spend on KPIs, brand aggregates, statistical tests
+# and chart data for frames of 10k, 100k and 1M products, through the same
+# pandas paths render() uses for a loaded frame or saved run.
+# Run from the repository root:  python -m benchmarks.bench_dashboard
+import argparse
+import time
+import numpy as np
+from benchmarks.fixtures import clean_frame
+from dashboards.data import DTYPES
+from dashboards.queries import product_kpis, top_product, availability_counts, brand_summary
+from dashboards.stats import moments, _anova_from
+from dashboards.charts import thin
+
+
+def steps(frame):
+    return {
+        'kpis': lambda: (product_kpis(frame=frame), top_product('rating', frame=frame),
+                         top_product('number_of_ratings', frame=frame)),
+        'availability': lambda: availability_counts(frame=frame),
+        'brand_summary': lambda: brand_summary(frame=frame),
+        'anova': lambda: (_anova_from(moments(frame, 'brand', ['rating']), 'rating'),
+                          _anova_from(moments(frame, 'availability', ['rating']), 'rating')),
+        'histograms': lambda: [np.histogram(frame[c].dropna().to_numpy('float64'), bins=30)
+                               for c in ['price', 'discount', 'rating']],
+        'scatter': lambda: thin(frame[['price', 'rating']].dropna().astype('float64'), 'price', 'rating'),
+    }
+
+
+def run(sizes, repeat):
+    results=[]
+    for rows in sizes:
+        frame=clean_frame(rows).astype(DTYPES)
+        for step, compute in steps(frame).items():
+            compute()
+            start=time.perf_counter()
+            for _ in range(repeat):
+                compute()
+            elapsed=(time.perf_counter() - start) / repeat
+            results.append({'step': step, 'rows': rows, 'seconds': round(elapsed, 4)})
+    return results
+
+
+if __name__ == '__main__':
+    parser=argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args=parser.parse_args()
+    for row in run(args.sizes, args.repeat):
+        print(f"{row['step']:>14}  {row['rows']:>9} rows  {row['seconds']:>8.4f}s")
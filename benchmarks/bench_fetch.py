@@ -0,0 +1,36 @@
+# Pages/second of ConcurrentFetcher.crawl against the local fixture server.
+# Run from the repository root:  python -m benchmarks.bench_fetch
+import argparse
+import time
+from benchmarks.fixtures import FixtureServer, load_corpus
+from scraper.extract import parse_products
+from scraper.fetch import ConcurrentFetcher
+from scraper.pipeline import pipelined_crawl
+
+
+def run(pages, latency, levels, parse_workers=0):
+    results=[]
+    with FixtureServer(latency=latency, pages=load_corpus(pages)) as server:
+        for workers in levels:
+            fetcher=ConcurrentFetcher(max_workers=workers, rate=1000, burst=workers)
+            start=time.perf_counter()
+            if parse_workers:
+                crawl=pipelined_crawl(fetcher, server.url, parse_products, workers=parse_workers)
+            else:
+                crawl=fetcher.crawl(server.url, parse_products)
+            crawled=sum(1 for _ in crawl)
+            elapsed=time.perf_counter() - start
+            results.append({'workers': workers, 'pages': crawled, 'seconds': round(elapsed, 3),
+                            'pages_per_sec': round(crawled / elapsed, 2)})
+    return results
+
+
+if __name__ == '__main__':
+    parser=argparse.ArgumentParser()
+    parser.add_argument('--pages', type=int, default=40)
+    parser.add_argument('--latency', type=float, default=0.1)
+    parser.add_argument('--levels', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    parser.add_argument('--parse-workers', type=int, default=0, help='parse in a process pool of this size')
+    args=parser.parse_args()
+    for row in run(args.pages, args.latency, args.levels, args.parse_workers):
+        print(f"workers={row['workers']:>3}  pages={row['pages']}  {row['seconds']:>7.3f}s  {row['pages_per_sec']:>8.2f} pages/s")
@@ -0,0 +1,37 @@
+# Cards/second of each extraction backend over the recorded result pages
+# (benchmarks/corpus), or the synthetic ones when none are recorded.
+# Run from the repository root:  python -m benchmarks.bench_parse
+import argparse
+import time
+from benchmarks.fixtures import load_corpus
+from scraper.extract import BACKENDS, get_backend
+
+
+def run(pages, repeat):
+    html_pages=load_corpus(pages)
+    results=[]
+    for name in BACKENDS:
+        try:
+            backend=get_backend(name)
+        except ImportError as e:
+            print(f"skipping {name}: {e}")
+            continue
+        # the backends' output is checked against each other in tests/test_parse.py
+        cards=sum(len(backend.parse(html)) for html in html_pages)
+        start=time.perf_counter()
+        for _ in range(repeat):
+            for html in html_pages:
+                backend.parse(html)
+        elapsed=time.perf_counter() - start
+        results.append({'backend': name, 'cards': cards * repeat, 'seconds': round(elapsed, 3),
+                        'cards_per_sec': round(cards * repeat / elapsed, 1)})
+    return results
+
+
+if __name__ == '__main__':
+    parser=argparse.ArgumentParser()
+    parser.add_argument('--pages', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=5)
+    args=parser.parse_args()
+    for row in run(args.pages, args.repeat):
+        print(f"{row['backend']:>5}  {row['cards']} cards  {row['seconds']:>7.3f}s  {row['cards_per_sec']:>10.1f} cards/s")
@@ -0,0 +1,104 @@
+# The dashboards' previous @st.cache_data loader against the ResultCache
+# that replaced it, for concurrent sessions each opening the dashboards
+# with one of several brand filters on a local SQLite file. Both caches are
+# process-wide and run one load per key, so database queries match; what
+# differs is what a hit costs (st.cache_data unpickles a fresh copy for
+# every hit, ResultCache hands back the stored frame), the memory the
+# cache holds (st.cache_data keeps every entry until its TTL, ResultCache
+# stops at max_bytes) and, with a spill directory, how many evicted
+# entries come back from disk instead of the database.
+# Run from the repository root:  python -m benchmarks.bench_sessions [--sessions 10] [--filters 8]
+import argparse
+import logging
+import os
+import tempfile
+import threading
+import time
+import pickle
+import pandas as pd
+import streamlit as st
+from sqlalchemy import event, text
+from benchmarks.fixtures import clean_frame, BRANDS
+from dashboards.cache import ResultCache
+from storage.engine import make_engine
+
+
+def run(rows, sessions, filters, reruns=5, hits=50):
+    # st.cache_data outside a streamlit server warns on every call
+    for name in list(logging.root.manager.loggerDict):
+        if name.startswith('streamlit'):
+            logging.getLogger(name).setLevel(logging.ERROR)
+    frame=clean_frame(rows)
+    # distinct two-brand filters, each about a fifth of the rows
+    choices=[(BRANDS[i % len(BRANDS)], BRANDS[(i + 1 + i // len(BRANDS)) % len(BRANDS)]) for i in range(filters)]
+    results=[]
+    with tempfile.TemporaryDirectory() as tmp:
+        engine=make_engine(f"sqlite:///{os.path.join(tmp, 'products.db')}")
+        frame.to_sql('scraped_cleandata', engine, index=False)
+        queries=[0]
+
+        @event.listens_for(engine, 'before_cursor_execute')
+        def count(*args):
+            queries[0]+=1
+
+        def load(brands):
+            with engine.connect() as conn:
+                return pd.read_sql(text("SELECT * FROM scraped_cleandata WHERE brand IN ("
+                                        + ', '.join(f"'{b}'" for b in brands) + ")"), conn)
+
+        # the loader as dashboards/data.py declared it before ResultCache
+        cache_data_load=st.cache_data(ttl=600, show_spinner=False)(load)
+        # room for about two of the filters' frames
+        budget=int(frame.memory_usage(deep=True).sum() * 2 // 5)
+        setups=[('st.cache_data', None), ('ResultCache', ResultCache()),
+                ('ResultCache bounded', ResultCache(max_bytes=budget)),
+                ('ResultCache + spill', ResultCache(max_bytes=budget, spill_dir=os.path.join(tmp, 'spill')))]
+        for name, cache in setups:
+            loader=cache.memoize(600)(load) if cache else cache_data_load
+            queries[0]=0
+
+            def session(i):
+                # each session reruns its filter's page a few times
+                for _ in range(reruns):
+                    loader(choices[i % filters])
+
+            threads=[threading.Thread(target=session, args=(i,)) for i in range(sessions)]
+            start=time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed=time.perf_counter() - start
+            loads=queries[0]
+            if cache:
+                held, spilled=cache.bytes, cache.spilled_bytes
+            else:
+                # st.cache_data holds every result pickled
+                held, spilled=sum(len(pickle.dumps(load(c))) for c in set(choices)), 0
+            # cost of one hit on the most recently used filter
+            recent=choices[(sessions - 1) % filters]
+            loader(recent)
+            start=time.perf_counter()
+            for _ in range(hits):
+                loader(recent)
+            hit=(time.perf_counter() - start) / hits
+            results.append({'cache': name, 'rows': rows, 'sessions': sessions, 'filters': filters,
+                            'queries': loads, 'held_mb': round(held / 1e6, 1),
+                            'spilled_mb': round(spilled / 1e6, 1),
+                            'hit_ms': round(hit * 1000, 3), 'copies': loader(recent) is not loader(recent),
+                            'seconds': round(elapsed, 3)})
+        st.cache_data.clear()
+    return results
+
+
+if __name__ == '__main__':
+    parser=argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--sessions', type=int, default=10)
+    parser.add_argument('--filters', type=int, default=8)
+    args=parser.parse_args()
+    for row in run(args.rows, args.sessions, args.filters):
+        print(f"{row['cache']:>20}  {row['sessions']:>3} sessions  {row['filters']:>2} filters  "
+              f"{row['queries']:>4} queries  {row['held_mb']:>7.1f} MB held  {row['spilled_mb']:>7.1f} MB spilled  "
+              f"{row['hit_ms']:>8.3f} ms/hit  "
+              f"{'copy' if row['copies'] else 'shared':>6}  {row['seconds']:>7.3f}s")
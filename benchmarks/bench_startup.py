@@ -0,0 +1,72 @@
+# What a cold server process imports before it can serve its first page,
+# from `python -X importtime` in a fresh interpreter per scenario: the login
+# page Home.py renders after a dyno restart, each dashboard page and the
+# scraper the first time they are used, and, for comparison, everything
+# Home.py used to import up front.
+# Run from the repository root:  python -m benchmarks.bench_startup [--top 10]
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY=['pandas', 'numpy', 'pyarrow', 'plotly', 'scipy', 'sqlalchemy', 'requests', 'bs4', 'lxml']
+
+# the AppTest harness is imported by the baseline, so only what Home.py
+# itself pulls in is counted for the login page
+APPTEST='from streamlit.testing.v1 import AppTest'
+SCENARIOS={
+    'login page': (APPTEST, APPTEST + "; AppTest.from_file('Home.py').run(timeout=60)"),
+    'product & brand insights': ('import streamlit', 'import dashboards.product_brand_insights'),
+    'customer satisfaction': ('import streamlit', 'import dashboards.customer_satisfaction'),
+    'home (job queue)': ('import streamlit', 'import db, storage.jobs, streamlit_autorefresh'),
+    'scraping': ('import streamlit', 'import crawler'),
+    'eager (before)': ('import streamlit', 'import dashboards.product_brand_insights, dashboards.customer_satisfaction,'
+                                            ' dashboards.data, db, storage.jobs, crawler, scraper.metrics,'
+                                            ' streamlit_autorefresh'),
+}
+
+
+def importtime(code):
+    # {module: (self_us, cumulative_us, depth)} for every module imported
+    result=subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=ROOT,
+                          capture_output=True, text=True)
+    if result.returncode:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    modules={}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative, name=line[len('import time:'):].split('|')
+        modules[name.strip()]=(int(self_us), int(cumulative), (len(name) - len(name.lstrip()) - 1) // 2)
+    return modules
+
+
+def measure(baseline, code):
+    # modules imported by code on top of baseline, their total import time,
+    # and the slowest top-level imports among them
+    before=importtime(baseline)
+    after=importtime(code)
+    added={name: row for name, row in after.items() if name not in before}
+    top=sorted(((row[1], name) for name, row in added.items() if row[2] == 0), reverse=True)
+    return {
+        'modules': len(added),
+        'seconds': round(sum(row[0] for row in added.values()) / 1e6, 3),
+        'heavy': [name for name in HEAVY if name in added],
+        'top': [(name, round(us / 1e6, 3)) for us, name in top],
+    }
+
+
+def run(scenarios=SCENARIOS):
+    return [{'scenario': name, **measure(baseline, code)} for name, (baseline, code) in scenarios.items()]
+
+
+if __name__ == '__main__':
+    parser=argparse.ArgumentParser()
+    parser.add_argument('--top', type=int, default=5, help='slowest imports listed per scenario')
+    args=parser.parse_args()
+    for row in run():
+        print(f"{row['scenario']:>26}  {row['seconds']:>7.3f}s  {row['modules']:>5} modules  "
+              f"heavy: {', '.join(row['heavy']) or '-'}")
+        for name, seconds in row['top'][:args.top]:
+            print(f"{'':>28}{seconds:>7.3f}s  {name}")
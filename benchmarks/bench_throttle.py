@@ -0,0 +1,78 @@
+# Crawl against a fixture server that answers 429 (Retry-After: 1) once
+# requests arrive faster than its own token bucket allows, comparing fixed
+# request rates with the AdaptiveRateLimiter. late_429s counts the 429s
+# answered more than a Retry-After after the first one, once an adaptive
+# limiter has had its first cut.
+# Run from the repository root:  python -m benchmarks.bench_throttle
+import argparse
+import threading
+import time
+from benchmarks.fixtures import FixtureServer
+from scraper.extract import parse_products
+from scraper.fetch import ConcurrentFetcher, FetchClient, HostRateLimiter, AdaptiveRateLimiter
+
+
+class ThrottlingServer(FixtureServer):
+    def __init__(self, allowed_rate, **kwargs):
+        super().__init__(**kwargs)
+        self.allowed_rate=allowed_rate
+        self.throttled=0
+        self.throttled_at=[]
+        self._tokens=1.0
+        self._last=time.monotonic()
+        self._lock=threading.Lock()
+
+    def respond(self, handler, page):
+        with self._lock:
+            now=time.monotonic()
+            self._tokens=min(1.0, self._tokens + (now - self._last) * self.allowed_rate)
+            self._last=now
+            allowed=self._tokens >= 1
+            if allowed:
+                self._tokens-=1
+            else:
+                self.throttled+=1
+                self.throttled_at.append(now)
+        if not allowed:
+            handler.send_response(429)
+            handler.send_header('Retry-After', '1')
+            handler.send_header('Content-Length', '0')
+            handler.end_headers()
+            return None
+        return super().respond(handler, page)
+
+
+def run(pages, allowed_rate, start_rate, workers):
+    results=[]
+    limiters={
+        f'fixed {start_rate}/s': lambda: HostRateLimiter(start_rate),
+        f'fixed {allowed_rate}/s': lambda: HostRateLimiter(allowed_rate),
+        f'adaptive from {start_rate}/s': lambda: AdaptiveRateLimiter(start_rate, cooldown=1.0),
+    }
+    for name, make in limiters.items():
+        with ThrottlingServer(allowed_rate, last_page=pages, latency=0.02) as server:
+            limiter=make()
+            client=FetchClient(retries=8, backoff=0.2, max_backoff=5, pool_size=workers)
+            fetcher=ConcurrentFetcher(max_workers=workers, client=client, limiter=limiter)
+            start=time.perf_counter()
+            crawled=sum(1 for _ in fetcher.crawl(server.url, parse_products))
+            elapsed=time.perf_counter() - start
+            host=limiter.metrics().get(server.url.split('/')[2], {})
+            results.append({'limiter': name, 'pages': crawled, 'seconds': round(elapsed, 2),
+                            'requests': server.requests, 'throttled': server.throttled,
+                            'late_429s': sum(1 for at in server.throttled_at if at > server.throttled_at[0] + 1)
+                            if server.throttled_at else 0,
+                            'final_rate': round(host.get('rate', 0), 2), 'stall_seconds': host.get('stall_seconds')})
+    return results
+
+
+if __name__ == '__main__':
+    parser=argparse.ArgumentParser()
+    parser.add_argument('--pages', type=int, default=40)
+    parser.add_argument('--allowed-rate', type=float, default=5.0, help='requests/s the server accepts')
+    parser.add_argument('--start-rate', type=float, default=20.0)
+    parser.add_argument('--workers', type=int, default=8)
+    args=parser.parse_args()
+    for row in run(args.pages, args.allowed_rate, args.start_rate, args.workers):
+        print(f"{row['limiter']:<22} pages={row['pages']}  {row['seconds']:>6.2f}s  requests={row['requests']:>4}"
+              f"  429s={row['throttled']:>4} ({row['late_429s']:>3} late)  rate={row['final_rate']:>6}/s  stalled={row['stall_seconds']}s")
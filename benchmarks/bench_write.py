@@ -0,0 +1,55 @@
+# Rows/second writing a cleaned frame with the previous
+# DataFrame.to_sql(if_exists='replace') call versus upsert_cleandata(),
+# on a local SQLite file. --rtt adds a simulated network round trip to every
+# statement (and every row of an executemany, as pymssql sends them), which
+# is what dominates against the Azure SQL server.
+# Run from the repository root:  python -m benchmarks.bench_write
+import argparse
+import os
+import tempfile
+import time
+from sqlalchemy import event
+from benchmarks.fixtures import clean_frame
+from storage.cleandata import upsert_cleandata
+from storage.engine import make_engine
+
+
+def sqlite_engine(path, rtt):
+    engine=make_engine(f"sqlite:///{path}")
+    if rtt:
+        @event.listens_for(engine, 'before_cursor_execute')
+        def round_trip(conn, cursor, statement, parameters, context, executemany):
+            time.sleep(rtt * (len(parameters) if executemany else 1))
+    return engine
+
+
+def run(rows, rtt, chunksize):
+    frame=clean_frame(rows)
+    results=[]
+    with tempfile.TemporaryDirectory() as tmp:
+        engine=sqlite_engine(os.path.join(tmp, 'to_sql.db'), rtt)
+        start=time.perf_counter()
+        frame.to_sql('scraped_cleandata', con=engine, if_exists='replace', index=False)
+        elapsed=time.perf_counter() - start
+        results.append({'writer': 'to_sql', 'rows': rows, 'seconds': round(elapsed, 3), 'rows_per_sec': round(rows / elapsed)})
+
+        engine=sqlite_engine(os.path.join(tmp, 'bulk.db'), rtt)
+        written=upsert_cleandata(frame, engine, chunksize)
+        results.append({'writer': 'bulk load', 'rows': rows, 'seconds': round(written['seconds'], 3),
+                        'rows_per_sec': round(written['rows_per_sec'])})
+
+        frame['price']=frame['price'] * 0.9
+        written=upsert_cleandata(frame, engine, chunksize)
+        results.append({'writer': 'bulk merge', 'rows': rows, 'seconds': round(written['seconds'], 3),
+                        'rows_per_sec': round(written['rows_per_sec'])})
+    return results
+
+
+if __name__ == '__main__':
+    parser=argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--rtt', type=float, default=0.0005, help='simulated seconds per round trip')
+    parser.add_argument('--chunksize', type=int, default=1000)
+    args=parser.parse_args()
+    for row in run(args.rows, args.rtt, args.chunksize):
+        print(f"{row['writer']:>10}  {row['rows']} rows  {row['seconds']:>8.3f}s  {row['rows_per_sec']:>10,} rows/s")
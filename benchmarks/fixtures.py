@@ -0,0 +1,186 @@
+# Synthetic Flipkart search-result pages using the same markup/classes the
+# scraper reads, recorded real pages, and a local HTTP server that serves
+# either as ?page=N.
+import glob
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+BRANDS=['samsung', 'apple', 'realme', 'redmi', 'vivo', 'oppo', 'motorola', 'poco', 'iqoo', 'nothing']
+
+
+def product_card(rng, i):
+    brand=rng.choice(BRANDS).title()
+    pid=f"MOB{rng.randrange(16**12):012X}"
+    price=rng.randrange(5000, 150000)
+    discount=f'<div class="HQe8jr"><span>{rng.randrange(1, 60)}% off</span></div>' if rng.random() < 0.8 else ''
+    rating=f'<div class="MKiFS6">{rng.choice(["3.9", "4.1", "4.3", "4.5", "4.6"])}</div>' if rng.random() < 0.9 else ''
+    ratings=(f'<span class="PvbNMB"><span>{rng.randrange(10, 200000):,} Ratings&nbsp;&amp;&nbsp;'
+             f'{rng.randrange(1, 9000):,} Reviews</span></span>') if rng.random() < 0.9 else ''
+    stock=f'<div class="HZ0E6r Rm9_cy">Only {rng.randrange(1, 9)} left</div>' if rng.random() < 0.1 else ''
+    return f'''
+    <div class="jIjQ8S">
+      <a class="k7wcnx" href="/{brand.lower()}-phone-{i}/p/{pid}?pid={pid}&amp;lid=LST{pid}">
+        <div class="RG5Slk">{brand} Model {i} (Black, 128 GB)</div>
+        {rating}{ratings}
+        <div class="hZ3P6w DeU9vF">₹{price:,}</div>
+        {discount}{stock}
+      </a>
+    </div>'''
+
+
+def result_page(page, cards=24, last_page=None, seed=0):
+    body=''
+    if last_page is None or page <= last_page:
+        rng=random.Random(seed * 100003 + page)
+        body=''.join(product_card(rng, (page - 1) * cards + i) for i in range(cards))
+    return f'''<!DOCTYPE html><html><head><title>Flipkart</title></head><body>
+    <div class="QSCKDh dLgFEE">{body}</div></body></html>'''
+
+
+def corpus(pages, cards=24, seed=0):
+    return [result_page(page, cards, seed=seed) for page in range(1, pages + 1)]
+
+
+CORPUS_DIR=os.path.join(os.path.dirname(__file__), 'corpus')
+
+
+def record_corpus(url, pages, directory=CORPUS_DIR):
+    # saves pages 1..pages of a live search as page-NNN.html for replay
+    from scraper.fetch import FetchClient, page_url
+    os.makedirs(directory, exist_ok=True)
+    client=FetchClient()
+    try:
+        for page in range(1, pages + 1):
+            html=client.get(page_url(url, page)).text
+            with open(os.path.join(directory, f"page-{page:03d}.html"), 'w', encoding='utf-8') as f:
+                f.write(html)
+            time.sleep(1)
+    finally:
+        client.close()
+
+
+def load_corpus(pages, directory=CORPUS_DIR):
+    # recorded pages from directory, repeated up to `pages`, or the
+    # synthetic corpus when nothing has been recorded
+    paths=sorted(glob.glob(os.path.join(directory, '*.html')))
+    if not paths:
+        return corpus(pages)
+    recorded=[]
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            recorded.append(f.read())
+    return [recorded[i % len(recorded)] for i in range(pages)]
+
+
+class FixtureServer:
+    # serves result_page(page) for /search?q=...&page=N, or the given list
+    # of recorded pages followed by empty ones, with an optional per-request
+    # latency so network-bound code paths can be measured
+    def __init__(self, last_page=40, cards=24, latency=0.05, pages=None):
+        self.last_page=len(pages) if pages is not None else last_page
+        self.recorded=pages
+        self.cards=cards
+        self.latency=latency
+        self.requests=0
+        self._pages={}
+        server=self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version='HTTP/1.1'
+
+            def do_GET(self):
+                server.requests+=1
+                query=parse_qs(urlsplit(self.path).query)
+                page=int(query.get('page', ['1'])[0])
+                body=server.respond(self, page)
+                if body is None:
+                    return
+                data=body.encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd=ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.httpd.daemon_threads=True
+
+    def respond(self, handler, page):
+        if self.latency:
+            time.sleep(self.latency)
+        if self.recorded is not None and 1 <= page <= len(self.recorded):
+            return self.recorded[page - 1]
+        if page not in self._pages:
+            self._pages[page]=result_page(page, self.cards, self.last_page)
+        return self._pages[page]
+
+    @property
+    def url(self):
+        host, port=self.httpd.server_address
+        return f"http://{host}:{port}/search?q=mobiles"
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def clean_frame(rows, seed=0, brands=None):
+    # a cleaned scraped_cleandata-shaped frame of synthetic products
+    import numpy as np
+    import pandas as pd
+    rng=np.random.default_rng(seed)
+    brands=np.array(brands or BRANDS)
+    brand=brands[rng.integers(0, len(brands), rows)]
+    left=rng.integers(1, 10, rows)
+    availability=np.where(rng.random(rows) < 0.1, np.char.add(np.char.add('Only ', left.astype(str)), ' left'), 'In Stock')
+    rating=np.round(rng.uniform(3.0, 5.0, rows), 1)
+    rating[rng.random(rows) < 0.1]=np.nan
+    ratings=pd.array(rng.integers(1, 200000, rows), dtype='Int64')
+    ratings[rng.random(rows) < 0.1]=pd.NA
+    return pd.DataFrame({
+        'product_id': [f"MOB{i:013X}" for i in range(rows)],
+        'product_name': np.char.add(np.char.add(np.char.capitalize(brand), ' Model '), np.arange(rows).astype(str)),
+        'brand': brand,
+        'price': rng.integers(5000, 150000, rows).astype(float),
+        'discount': np.where(rng.random(rows) < 0.8, rng.integers(1, 60, rows), 0).astype(float),
+        'availability': availability,
+        'rating': rating,
+        'number_of_ratings': ratings,
+    })
+
+
+def raw_frame(rows, seed=0):
+    # raw extracted text columns (scraper.extract.RAW_COLUMNS) as the
+    # backends' parse_raw() returns them, with the usual missing fields
+    import numpy as np
+    import pandas as pd
+    rng=np.random.default_rng(seed)
+
+    def sometimes(values, p):
+        values=pd.Series(values, dtype=object)
+        values[rng.random(rows) >= p]=None
+        return values
+
+    brand=np.array(BRANDS)[rng.integers(0, len(BRANDS), rows)]
+    ids=np.arange(rows).astype(str)
+    return pd.DataFrame({
+        'name': np.char.add(np.char.add(np.char.capitalize(brand), ' Model '), ids),
+        'price': [f"₹{p:,}" for p in rng.integers(5000, 150000, rows).tolist()],
+        'rating': sometimes(np.round(rng.uniform(3.0, 5.0, rows), 1).astype(str), 0.9),
+        'discount': sometimes(np.char.add(rng.integers(1, 60, rows).astype(str), '% off'), 0.8),
+        'stock': sometimes(np.char.add(np.char.add('Only ', rng.integers(1, 10, rows).astype(str)), ' left'), 0.1),
+        'ratings': sometimes([f"{a:,} Ratings\xa0&\xa0{b:,} Reviews" for a, b in
+                              zip(rng.integers(10, 200000, rows).tolist(), rng.integers(1, 9000, rows).tolist())], 0.9),
+        'href': np.char.add(np.char.add('/phone-', ids), np.char.add('/p/MOB', ids)),
+    })
@@ -0,0 +1,97 @@
+# Runs every benchmark at the suite's sizes and writes the results, with the
+# commit and environment they were measured on, to
+# benchmarks/results/<timestamp>-<commit>.json. --compare prints each
+# measurement against an earlier results file.
+# Run from the repository root:
+#   python -m benchmarks.suite [--sizes 10000 100000 1000000] [--compare benchmarks/results/<file>.json]
+#   python -m benchmarks.suite --record "https://www.flipkart.com/search?q=mobiles" --pages 5
+import argparse
+import json
+import os
+import platform
+import subprocess
+import time
+from benchmarks import bench_fetch, bench_parse, bench_clean, bench_write, bench_dashboard
+from benchmarks.fixtures import record_corpus, CORPUS_DIR
+
+RESULTS_DIR=os.path.join(os.path.dirname(__file__), 'results')
+# fields that identify a measurement; the rest are timings and rates
+KEYS=['bench', 'workers', 'backend', 'path', 'writer', 'step', 'rows']
+
+
+def commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def run(sizes, pages, latency):
+    benches=[
+        ('fetch', lambda: bench_fetch.run(pages, latency, [1, 4, 8])),
+        ('parse', lambda: bench_parse.run(pages, 3)),
+        ('clean', lambda: [row for rows in sizes for row in bench_clean.run(rows)]),
+        ('write', lambda: [row for rows in sizes for row in bench_write.run(rows, 0, 1000)]),
+        ('dashboard', lambda: bench_dashboard.run(sizes, 3)),
+    ]
+    results=[]
+    for name, bench in benches:
+        start=time.perf_counter()
+        rows=bench()
+        print(f"{name}: {len(rows)} measurements in {time.perf_counter() - start:.1f}s")
+        results+=[{'bench': name, **row} for row in rows]
+    return results
+
+
+def _key(row):
+    return tuple((k, row[k]) for k in KEYS if k in row)
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline={_key(row): row for row in json.load(f)['results']}
+    for row in results:
+        before=baseline.get(_key(row))
+        if before is None or not before.get('seconds'):
+            continue
+        ratio=row['seconds'] / before['seconds']
+        label=' '.join(str(v) for _, v in _key(row))
+        flag='  <-- slower' if ratio > 1.1 else ''
+        print(f"{label:<45} {before['seconds']:>9.4f}s -> {row['seconds']:>9.4f}s  x{ratio:.2f}{flag}")
+
+
+def main():
+    parser=argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--pages', type=int, default=40, help='result pages for the fetch and parse benchmarks')
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--out', help='results file (default benchmarks/results/<timestamp>-<commit>.json)')
+    parser.add_argument('--compare', help='earlier results file to compare against')
+    parser.add_argument('--record', metavar='URL', help=f'record --pages live result pages into {CORPUS_DIR} and exit')
+    args=parser.parse_args()
+
+    if args.record:
+        record_corpus(args.record, args.pages)
+        return
+    results=run(args.sizes, args.pages, args.latency)
+    report={
+        'commit': commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'machine': platform.platform(),
+        'cpus': os.cpu_count(),
+        'sizes': args.sizes,
+        'results': results,
+    }
+    path=args.out or os.path.join(RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{report['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"wrote {path}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+# Background crawler, run outside the Streamlit process:
+#   python crawler.py worker [--workers 2] [--schedule crawl_schedule.json]
+#   python crawler.py submit QUERY [QUERY ...] [--batch] [--offline]
+#   python crawler.py once QUERY [QUERY ...] [--offline] [--csv PATH]
+#   python crawler.py report JOB_ID [--prometheus]
+# A QUERY is a search URL or keywords. --batch queues all of them as one job
+# sharing a frontier, so products found by several searches are written once.
+# The schedule file is JSON: {"interval_hours": 6, "searches": ["https://www.flipkart.com/search?q=...", "5g phones"]}
+# and its searches are re-crawled together as one batch job.
+import argparse
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from db import get_engine
+from scraper.runner import run_batch
+from scraper.metrics import prometheus
+from storage.engine import pool_metrics
+from storage.jobs import submit_job, claim_job, update_job, heartbeat, get_job, worker_name, DONE, FAILED, HEARTBEAT
+
+log=logging.getLogger('crawler')
+
+
+def keep_alive(engine, job_id, stop):
+    # renews the job's lease until stop is set, also through long pages
+    while not stop.wait(HEARTBEAT):
+        try:
+            heartbeat(engine, job_id)
+        except Exception:
+            log.exception("job %s: heartbeat failed", job_id)
+
+
+def run_job(engine, job, on_flush=None):
+    def on_page(page, chunk, summary):
+        update_job(engine, job['id'], pages=summary['pages'], products=summary['rows'],
+                   report=json.dumps(summary['report']))
+
+    log.info("job %s: crawling %s", job['id'], job['url'].replace('\n', ', '))
+    stop=threading.Event()
+    threading.Thread(target=keep_alive, args=(engine, job['id'], stop), name=f"heartbeat-{job['id']}",
+                     daemon=True).start()
+    try:
+        summary=run_batch(job['url'].splitlines(), engine, offline=job['offline'], on_page=on_page, on_flush=on_flush)
+    except Exception as e:
+        log.exception("job %s failed", job['id'])
+        update_job(engine, job['id'], status=FAILED, message=str(e)[:1000])
+        return
+    finally:
+        stop.set()
+    update_job(engine, job['id'], status=DONE, pages=summary['pages'], products=summary['rows'],
+               inserted=summary['inserted'], updated=summary['updated'], changes=summary['changes'],
+               skipped=summary['skipped'], message=summary['error'], report=json.dumps(summary['report']))
+    log.info("job %s: %s products over %s pages, rate limiter %s, connections %s", job['id'], summary['rows'],
+             summary['pages'], summary['limiter'], pool_metrics(engine))
+    for search in summary['left_early']:
+        log.info("job %s: left %s, its pages were already crawled by an earlier search", job['id'], search)
+
+
+def load_schedule(path):
+    with open(path) as f:
+        config=json.load(f)
+    return config.get('searches', []), float(config.get('interval_hours', 24)) * 3600
+
+
+class Crawler:
+    # claims queued jobs into a pool of worker threads and, given a schedule,
+    # re-submits its searches as one batch every interval
+    def __init__(self, engine, workers=1, poll=5.0, schedule=None, on_flush=None):
+        self.engine=engine
+        self.workers=workers
+        self.poll=poll
+        self.schedule=schedule
+        self.on_flush=on_flush
+        self.name=worker_name()
+        self.stop=threading.Event()
+        self._next_due={}
+
+    def enqueue_due(self):
+        searches, interval=load_schedule(self.schedule)
+        batch='\n'.join(searches)
+        now=time.monotonic()
+        if searches and self._next_due.get(batch, 0) <= now:
+            job_id=submit_job(self.engine, batch)
+            log.info("scheduled %s searches as job %s", len(searches), job_id)
+            self._next_due[batch]=now + interval
+
+    def run_forever(self):
+        running=set()
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            while not self.stop.is_set():
+                if self.schedule:
+                    self.enqueue_due()
+                running={f for f in running if not f.done()}
+                while len(running) < self.workers:
+                    job=claim_job(self.engine, self.name)
+                    if job is None:
+                        break
+                    running.add(pool.submit(run_job, self.engine, job, self.on_flush))
+                self.stop.wait(self.poll)
+
+    def start(self):
+        thread=threading.Thread(target=self.run_forever, name='crawler', daemon=True)
+        thread.start()
+        return thread
+
+
+def main():
+    parser=argparse.ArgumentParser(description='Flipkart search crawler')
+    commands=parser.add_subparsers(dest='command', required=True)
+    worker=commands.add_parser('worker', help='run queued jobs until stopped')
+    worker.add_argument('--workers', type=int, default=2)
+    worker.add_argument('--poll', type=float, default=5.0, help='seconds between queue checks')
+    worker.add_argument('--schedule', help='JSON file of searches to re-crawl every interval')
+    submit=commands.add_parser('submit', help='queue searches for a worker')
+    submit.add_argument('queries', nargs='+')
+    submit.add_argument('--batch', action='store_true', help='one job for all queries')
+    submit.add_argument('--offline', action='store_true')
+    once=commands.add_parser('once', help='crawl searches in this process')
+    once.add_argument('queries', nargs='+')
+    once.add_argument('--offline', action='store_true')
+    once.add_argument('--csv', metavar='PATH', help='also append the cleaned products to this CSV file')
+    once.add_argument('--stale-pages', type=int, default=0, metavar='N',
+                      help='leave a later search after N pages in a row of products already found')
+    report=commands.add_parser('report', help="print a job's run report")
+    report.add_argument('job_id', type=int)
+    report.add_argument('--prometheus', action='store_true', help='Prometheus text format instead of JSON')
+    args=parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(name)s %(levelname)s %(message)s')
+    engine=get_engine()
+    if args.command == 'worker':
+        Crawler(engine, args.workers, args.poll, args.schedule).run_forever()
+    elif args.command == 'submit':
+        batches=['\n'.join(args.queries)] if args.batch else args.queries
+        for queries in batches:
+            print(submit_job(engine, queries, args.offline))
+    elif args.command == 'report':
+        job=get_job(engine, args.job_id)
+        if job is None or not job['report'] or job['report'] == 'null':
+            parser.exit(1, f"no report for job {args.job_id}\n")
+        run_report=json.loads(job['report'])
+        print(prometheus(run_report) if args.prometheus else json.dumps(run_report, indent=2))
+    else:
+        print(json.dumps(run_batch(args.queries, engine, offline=args.offline, csv=args.csv,
+                                   stale_pages=args.stale_pages), default=str))
+
+
+if __name__ == '__main__':
+    main()
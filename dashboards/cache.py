@@ -0,0 +1,205 @@
+import atexit
+import hashlib
+import inspect
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+import numpy as np
+import pandas as pd
+
+# One result cache per server process, shared by every session: a value is
+# computed once per distinct key however many analysts ask for it, and held
+# once in memory instead of once per session. Entries are evicted least
+# recently used first when they exceed max_bytes; with a spill_dir evicted
+# entries are pickled to disk and read back on their next use until
+# spill_bytes is exceeded there too. Values are returned as is, not copied,
+# so callers must not modify them in place.
+
+
+def sizeof(value):
+    # approximate bytes held by a cached value
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return int(value.memory_usage(deep=True).sum() if isinstance(value, pd.DataFrame)
+                   else value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(sizeof(v) for v in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(sizeof(k) + sizeof(v) for k, v in value.items())
+    return sys.getsizeof(value)
+
+
+class ResultCache:
+    def __init__(self, max_bytes=512 * 1024 * 1024, spill_dir=None, spill_bytes=2 * 1024 * 1024 * 1024):
+        self.max_bytes=max_bytes
+        self.spill_bytes=spill_bytes
+        self._lock=threading.Lock()
+        # key -> [lock, waiters]: concurrent misses on the same key wait for
+        # the first computation instead of all querying the database
+        self._loading={}
+        self._entries=OrderedDict()   # key -> (value, size, expires)
+        self._spilled=OrderedDict()   # key -> (path, size, expires)
+        self._spilling={}             # key -> (value, expires) while being written
+        self.bytes=0
+        self.spilled_bytes=0
+        self.spill_dir=None
+        if spill_dir:
+            # a directory of this process's own, as other processes' entries
+            # belong to their own data versions
+            os.makedirs(spill_dir, exist_ok=True)
+            self.spill_dir=tempfile.mkdtemp(prefix=f"{os.getpid()}-", dir=spill_dir)
+            atexit.register(shutil.rmtree, self.spill_dir, True)
+
+    def get(self, key):
+        # (True, value) for a live entry, else (False, None)
+        now=time.monotonic()
+        with self._lock:
+            entry=self._entries.get(key)
+            if entry is not None and entry[2] > now:
+                self._entries.move_to_end(key)
+                return True, entry[0]
+            if entry is not None:
+                self._drop(key)
+            spilling=self._spilling.pop(key, None)
+            spilled=self._spilled.pop(key, None)
+            if spilled is not None:
+                self.spilled_bytes-=spilled[1]
+        if spilling is not None and spilling[1] > now:
+            # evicted a moment ago and still being written out
+            self.put(key, spilling[0], spilling[1] - now)
+            return True, spilling[0]
+        if spilled is not None and spilled[2] > now:
+            try:
+                with open(spilled[0], 'rb') as f:
+                    value=pickle.load(f)
+            except (OSError, pickle.UnpicklingError, EOFError):
+                value=None
+            else:
+                self._remove(spilled[0])
+                self.put(key, value, spilled[2] - now)
+                return True, value
+        if spilled is not None:
+            self._remove(spilled[0])
+        return False, None
+
+    def put(self, key, value, ttl):
+        size=sizeof(value)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._spilling.pop(key, None)
+            stale=self._spilled.pop(key, None)
+            if stale is not None:
+                self.spilled_bytes-=stale[1]
+            self._entries[key]=(value, size, time.monotonic() + ttl)
+            self.bytes+=size
+            evicted=[]
+            while self.bytes > self.max_bytes and len(self._entries) > 1:
+                old, (old_value, old_size, expires)=self._entries.popitem(last=False)
+                self.bytes-=old_size
+                if self.spill_dir is not None and expires > time.monotonic():
+                    self._spilling[old]=(old_value, expires)
+                    evicted.append((old, old_value, expires))
+        if stale is not None:
+            self._remove(stale[0])
+        # pickling runs outside the lock so other sessions are not held up
+        for old, old_value, expires in evicted:
+            self._spill(old, old_value, expires)
+
+    def get_or_compute(self, key, compute, ttl):
+        found, value=self.get(key)
+        if found:
+            return value
+        with self._lock:
+            loading=self._loading.setdefault(key, [threading.Lock(), 0])
+            loading[1]+=1
+        try:
+            with loading[0]:
+                found, value=self.get(key)
+                if found:
+                    return value
+                value=compute()
+                self.put(key, value, ttl)
+                return value
+        finally:
+            with self._lock:
+                loading[1]-=1
+                if not loading[1]:
+                    del self._loading[key]
+
+    def memoize(self, ttl, version=None):
+        # Decorator caching a function's results on its arguments, plus
+        # version() when given. As with st.cache_data, parameters whose name
+        # starts with "_" are left out of the key.
+        def decorate(func):
+            name=f"{func.__module__}.{func.__qualname__}"
+            signature=inspect.signature(func)
+
+            @wraps(func)
+            def cached(*args, **kwargs):
+                bound=signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                key=(name, version() if version else None,
+                     tuple((k, v) for k, v in bound.arguments.items() if not k.startswith('_')))
+                return self.get_or_compute(key, lambda: func(*args, **kwargs), ttl)
+            return cached
+        return decorate
+
+    def clear(self):
+        with self._lock:
+            paths=[path for path, _, _ in self._spilled.values()]
+            self._entries.clear()
+            self._spilled.clear()
+            self._spilling.clear()
+            self.bytes=self.spilled_bytes=0
+        for path in paths:
+            self._remove(path)
+
+    def _drop(self, key):
+        _, size, _=self._entries.pop(key)
+        self.bytes-=size
+
+    def _spill(self, key, value, expires):
+        path=os.path.join(self.spill_dir, hashlib.sha256(repr(key).encode('utf-8')).hexdigest() + '.pkl')
+        try:
+            with open(path, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        except (OSError, pickle.PicklingError, TypeError, AttributeError):
+            with self._lock:
+                self._spilling.pop(key, None)
+            self._remove(path)
+            return
+        size=os.path.getsize(path)
+        dropped=[]
+        with self._lock:
+            # None when read back into memory, or cleared, while it was written
+            wanted=self._spilling.pop(key, None) is not None
+        if not wanted:
+            self._remove(path)
+            return
+        with self._lock:
+            previous=self._spilled.pop(key, None)
+            if previous is not None:
+                self.spilled_bytes-=previous[1]
+            self._spilled[key]=(path, size, expires)
+            self.spilled_bytes+=size
+            while self.spilled_bytes > self.spill_bytes and self._spilled:
+                _, (old_path, old_size, _)=self._spilled.popitem(last=False)
+                self.spilled_bytes-=old_size
+                dropped.append(old_path)
+        for old_path in dropped:
+            self._remove(old_path)
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
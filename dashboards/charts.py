@@ -0,0 +1,137 @@
+import pandas as pd
+import numpy as np
+import plotly.graph_objects as go
+from dashboards.data import cached, data_version
+
+# Chart data prepared on the server so the browser only receives what it
+# draws: histogram bins instead of rows, box plot quartiles and whiskers
+# instead of rows, and scatter plots thinned to POINT_BUDGET points with
+# their OLS trendline fitted on every point. Results are memoised on
+# chart_key(), the data version plus the run and brand filter the frame was
+# built from, so reruns with the same selection reuse them without hashing
+# the frame.
+
+POINT_BUDGET=5_000
+# scatter thinning grid: dense cells are thinned, sparse ones kept whole
+DENSITY_GRID=64
+# box plot outliers drawn at most, the most extreme first
+MAX_OUTLIERS=200
+
+
+def chart_key(run, brands):
+    return (data_version(), run, tuple(brands) if brands else None)
+
+
+def _values(frame, column):
+    return frame[column].dropna().to_numpy(dtype='float64')
+
+
+@cached()
+def _histogram(column, nbins, key, _frame):
+    counts, edges=np.histogram(_values(_frame, column), bins=nbins)
+    return pd.DataFrame({'left': edges[:-1], 'right': edges[1:], 'count': counts})
+
+
+def histogram(frame, column, nbins, key):
+    # [left, right, count] per equal-width bin over the non-null values
+    return _histogram(column, nbins, key, frame)
+
+
+def histogram_figure(bins, column, color='green'):
+    fig=go.Figure(go.Bar(
+        x=(bins['left'] + bins['right']) / 2, y=bins['count'], width=bins['right'] - bins['left'],
+        marker_color=color, marker_line_color='black', marker_line_width=1,
+        customdata=bins[['left', 'right']], hovertemplate='%{customdata[0]:,.2f} - %{customdata[1]:,.2f}<br>count=%{y}<extra></extra>',
+    ))
+    fig.update_layout(xaxis_title=column, yaxis_title='count', bargap=0)
+    return fig
+
+
+@cached()
+def _box_stats(column, key, _frame):
+    values=np.sort(_values(_frame, column))
+    if not len(values):
+        return None
+    q1, median, q3=np.percentile(values, [25, 50, 75])
+    # whiskers reach the furthest values within 1.5 IQR, as px.box draws them
+    low, high=q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1)
+    inside=values[(values >= low) & (values <= high)]
+    outliers=np.concatenate([values[values < low], values[values > high]])
+    if len(outliers) > MAX_OUTLIERS:
+        outliers=outliers[np.argsort(-np.abs(outliers - median))[:MAX_OUTLIERS]]
+    return {'q1': q1, 'median': median, 'q3': q3, 'lowerfence': inside.min(), 'upperfence': inside.max(),
+            'outliers': outliers}
+
+
+def box_stats(frame, column, key):
+    # quartiles, whiskers and (at most MAX_OUTLIERS) outliers of a column
+    return _box_stats(column, key, frame)
+
+
+def box_figure(box, column):
+    fig=go.Figure()
+    if box is not None:
+        fig.add_trace(go.Box(name=column, q1=[box['q1']], median=[box['median']], q3=[box['q3']],
+                             lowerfence=[box['lowerfence']], upperfence=[box['upperfence']], x=[column],
+                             marker_color='#636efa', showlegend=False))
+        fig.add_trace(go.Scatter(x=[column] * len(box['outliers']), y=box['outliers'], mode='markers',
+                                 marker_color='#636efa', showlegend=False, hoverinfo='y'))
+    fig.update_layout(yaxis_title=column)
+    return fig
+
+
+def thin(frame, x, y, budget=POINT_BUDGET, seed=0):
+    # Density-aware downsampling: points are bucketed on a DENSITY_GRID x
+    # DENSITY_GRID grid and every cell keeps at most `cap` random points,
+    # with cap the largest value that fits the budget. Sparse regions and
+    # outliers survive whole while dense clusters are thinned.
+    if len(frame) <= budget:
+        return frame
+    cells=(pd.cut(frame[x], DENSITY_GRID, labels=False).astype('int64') * DENSITY_GRID
+           + pd.cut(frame[y], DENSITY_GRID, labels=False).astype('int64'))
+    counts=np.sort(cells.value_counts().to_numpy())
+    # kept(cap) = sum(min(count, cap)) grows with cap; take the largest fit
+    kept=np.cumsum(counts) + counts * np.arange(len(counts) - 1, -1, -1)
+    fits=counts[kept <= budget]
+    cap=int(fits[-1]) if len(fits) else max(1, budget // len(counts))
+    if len(fits) and len(fits) < len(counts):
+        # spare budget left below the next count raises the cap further
+        used=kept[len(fits) - 1]
+        cap+=int((budget - used) // (len(counts) - len(fits)))
+    order=np.random.default_rng(seed).permutation(len(frame))
+    shuffled=frame.iloc[order]
+    rank=cells.iloc[order].groupby(cells.iloc[order]).cumcount()
+    return shuffled[rank.to_numpy() < cap].sort_index()
+
+
+@cached()
+def _scatter(x, y, key, budget, _frame):
+    points=_frame[[x, y]].dropna().astype('float64')
+    if len(points) < 2:
+        return points, None
+    slope, intercept=np.polyfit(points[x], points[y], 1)
+    residual=points[y] - (slope * points[x] + intercept)
+    total=((points[y] - points[y].mean()) ** 2).sum()
+    fit={'slope': slope, 'intercept': intercept, 'r2': 1 - (residual ** 2).sum() / total if total else float('nan'),
+         'x0': points[x].min(), 'x1': points[x].max()}
+    return thin(points, x, y, budget), fit
+
+
+def scatter(frame, x, y, key, budget=POINT_BUDGET):
+    # (points, fit): rows with both x and y thinned to the budget, and the
+    # OLS fit of y on x over all of them
+    return _scatter(x, y, key, budget, frame)
+
+
+def add_trendline(fig, fit, x, y):
+    # the line px.scatter(trendline='ols') would draw
+    if fit is None:
+        return fig
+    xs=[fit['x0'], fit['x1']]
+    fig.add_trace(go.Scatter(
+        x=xs, y=[fit['slope'] * v + fit['intercept'] for v in xs], mode='lines', showlegend=False,
+        line_color='#636efa', name='OLS trendline',
+        hovertemplate=(f"<b>OLS trendline</b><br>{y} = {fit['slope']:.6g} * {x} + {fit['intercept']:.6g}"
+                       f"<br>R<sup>2</sup>={fit['r2']:.6f}<extra></extra>"),
+    ))
+    return fig
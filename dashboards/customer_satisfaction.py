@@ -1,14 +1,17 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
 import plotly.express as px
-import statsmodels
-from db import get_engine
-from scipy import stats
+from dashboards.data import load_products, load_run, select_run, use_pushdown, distinct_brands, brand_filter, SATISFACTION_COLUMNS, CHART_ROWS
+from dashboards.queries import product_kpis, top_product, brand_summary
+from dashboards.stats import anova
+from dashboards.charts import chart_key, histogram, histogram_figure, box_stats, box_figure, scatter, add_trendline
 
 def render():
-    engine=get_engine()
-    flipkart_products=pd.read_sql("SELECT * FROM scraped_cleandata", engine)
+    run=select_run()
+    pushdown=run is None and use_pushdown()
+    if run is not None:
+        flipkart_products=load_run(run, SATISFACTION_COLUMNS)
+    elif not pushdown:
+        flipkart_products=load_products(SATISFACTION_COLUMNS)
 
     st.set_page_config(layout='wide')
     st.title("👥 CUSTOMER SATISFACTION ANALYSIS")
@@ -16,19 +19,30 @@ def render():
     st.sidebar.header("Filters")
 
     # brand filter
-    brands=flipkart_products['brand'].unique().tolist()
-    brands.sort()
+    if pushdown:
+        brands=distinct_brands()
+    else:
+        brands=flipkart_products['brand'].unique().tolist()
+        brands.sort()
     brand_selected=st.sidebar.multiselect(
         "Select Brand :",
         options=brands,
         default=brands
     )
+    selected=brand_filter(brand_selected, brands)
 
     # Applying filters
-    if brand_selected:
-        filtered=flipkart_products[flipkart_products['brand'].isin(brand_selected)]
+    key=chart_key(run, selected)
+    if pushdown:
+        # KPIs and aggregates run in SQL; row-level charts and tests use a sample
+        scope={'brands': selected}
+        filtered=load_products(SATISFACTION_COLUMNS, selected, limit=CHART_ROWS)
     else:
-        filtered=flipkart_products.copy()
+        if selected:
+            filtered=flipkart_products[flipkart_products['brand'].isin(selected)]
+        else:
+            filtered=flipkart_products.copy()
+        scope={'frame': filtered}
 
     # KPIs
     def kpi_box(title, value):
@@ -57,25 +71,21 @@ def render():
         """, unsafe_allow_html=True
         )
 
+    kpis=product_kpis(**scope)
     col1, col2, col3, col4=st.columns(4)
     with col1:
-        kpi_box("Average Rating",f"⭐{round(filtered['rating'].mean())}")
+        kpi_box("Average Rating",f"⭐{round(kpis['avg_rating'])}")
 
-    max_rating_index = filtered['rating'].idxmax()
-    toprated_product = filtered.loc[max_rating_index]
+    toprated_product = top_product('rating', **scope)
     with col2:
         kpi_box("Product with High Average Rating",f"{toprated_product['product_name']} : ⭐{toprated_product['rating']}")
 
-    max_ratingcount_index = filtered['number_of_ratings'].idxmax()
-    top_product = filtered.loc[max_ratingcount_index]
+    popular_product = top_product('number_of_ratings', **scope)
     with col3:
-        kpi_box("Popular Product", f"{top_product['product_name']} with {int(top_product['number_of_ratings'])} ratings")
+        kpi_box("Popular Product", f"{popular_product['product_name']} with {int(popular_product['number_of_ratings'])} ratings")
 
-    high_rated_count = (filtered['rating'] >= 4).sum()
-    total_products = filtered.shape[0]
-    percentage_high_rated = (high_rated_count / total_products) * 100
     with col4:
-        kpi_box("Products with Average Rating >=4",f"{percentage_high_rated:.2f}%")
+        kpi_box("Products with Average Rating >=4",f"{kpis['high_rated_percent']:.2f}%")
     # Charts
     st.markdown('<h2 style="font-size:35px;">📈 Advanced Analytics</h2>', unsafe_allow_html=True)
     tab1, tab2, tab3  = st.tabs(
@@ -85,48 +95,24 @@ def render():
         st.subheader("Product Rating Distribution Analysis")
         c1, c2 = st.columns(2)
         with c1:
-            fig1 = px.histogram(
-            filtered,
-            x="rating",
-            nbins=30, 
-            color_discrete_sequence=["green"]  
-        )
-            fig1.update_traces(
-            marker_line_color="black",   
-            marker_line_width=1          
-        )
+            fig1 = histogram_figure(histogram(filtered, 'rating', 30, key), 'rating')
         c1.plotly_chart(fig1, width='stretch')
 
         with c2:
-            fig2 = px.box(
-                filtered,
-                y="rating",           
-            )
+            fig2 = box_figure(box_stats(filtered, 'rating', key), 'rating')
         c2.plotly_chart(fig2, width='stretch')
 
         st.subheader("Product Popularity Distribution Analysis")
         c3, c4=st.columns(2)
         with c3:
-            fig1 = px.histogram(
-            filtered.dropna(subset=['number_of_ratings']),
-            x="number_of_ratings",
-            nbins=20,   
-            color_discrete_sequence=["green"]
-        )
-            fig1.update_traces(
-            marker_line_color="black",   
-            marker_line_width=1          
-        )
+            fig1 = histogram_figure(histogram(filtered, 'number_of_ratings', 20, key), 'number_of_ratings')
         c3.plotly_chart(fig1, width='stretch')
         with c4:
-            fig2 = px.box(
-                filtered.dropna(subset=['number_of_ratings']),
-                y="number_of_ratings",           
-            )
+            fig2 = box_figure(box_stats(filtered, 'number_of_ratings', key), 'number_of_ratings')
         c4.plotly_chart(fig2, width='stretch')
 
     with tab2:
-        brand_avg_rating = filtered.groupby('brand')['rating'].mean().reset_index()
+        brand_avg_rating = brand_summary(**({'brands': selected} if run is None else scope))[['brand', 'avg_rating']].rename(columns={'avg_rating': 'rating'})
         fig = px.bar(
             brand_avg_rating,
             x='brand',
@@ -143,17 +129,18 @@ def render():
     
         c5, c6=st.columns(2)
         with c5:
+            points, fit = scatter(filtered, 'discount', 'rating', key)
             fig1 = px.scatter(
-                    filtered.dropna(subset=['rating']),
+                    points,
                     x='discount',        
                     y='rating', 
                     size='rating',                  
                     hover_data=['discount', 'rating'],  
                     title='DISCOUNT VS RATING',
                     color='rating',
-                    color_continuous_scale ='Cividis',
-                    trendline='ols'
+                    color_continuous_scale ='Cividis'
                     )
+            add_trendline(fig1, fit, 'discount', 'rating')
 
             fig1.update_layout(
                 xaxis_title='Discount (%)',
@@ -162,17 +149,18 @@ def render():
             c5.plotly_chart(fig1, width='stretch')
 
         with c6:
+            points, fit = scatter(filtered, 'price', 'rating', key)
             fig2 = px.scatter(
-                    filtered.dropna(subset=['rating']),
+                    points,
                     x='price',        
                     y='rating', 
                     size='rating',                  
                     hover_data=['price', 'rating'],  
                     title='PRICE VS RATING',
                     color='rating',
-                    color_continuous_scale ='plasma',
-                    trendline='ols'
+                    color_continuous_scale ='plasma'
                     )
+            add_trendline(fig2, fit, 'price', 'rating')
             
             fig2.update_layout(
                 xaxis_title='Price',
@@ -183,8 +171,7 @@ def render():
     with tab3:
         c7, c8=st.columns(2)
         with c7:
-            groups = [group['rating'].values for name, group in flipkart_products.dropna(subset=['rating']).groupby('brand')]
-            f_stat, p_value = stats.f_oneway(*groups)
+            f_stat, p_value = anova('rating', 'brand', run)
             st.markdown("<h3 style='font-size:20px;'>Statistical Test: Effect of Brand on Rating</h3>", 
                 unsafe_allow_html=True)
             st.write(f"F-statistic: {f_stat:.2f}")
@@ -195,8 +182,7 @@ def render():
                 st.info("There is no statistically significant evidence that brand affects rating (p ≥ 0.05).")
 
         with c8:
-            groups2 = [group['rating'].values for name, group in flipkart_products.dropna(subset=['rating']).groupby('availability')]
-            f_stat, p_value = stats.f_oneway(*groups2)
+            f_stat, p_value = anova('rating', 'availability', run)
             st.markdown("<h3 style='font-size:20px;'>Statistical Test: Effect of Availability on Rating</h3>", 
                 unsafe_allow_html=True)
             st.write(f"F-statistic: {f_stat:.2f}")
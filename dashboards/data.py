@@ -0,0 +1,145 @@
+import os
+import time
+import streamlit as st
+import pandas as pd
+from sqlalchemy import select, func
+from db import get_engine
+from storage.cleandata import cleandata
+from storage.jobs import jobs, ensure_jobs_table, DONE
+from storage.snapshots import list_runs, load_snapshot
+from dashboards.cache import ResultCache
+
+CACHE_TTL=600
+# loaded frames and computed dashboard results, shared by every session on
+# this server process; RESULT_CACHE_DIR turns on spilling evicted entries
+# to local disk
+RESULTS=ResultCache(max_bytes=int(os.getenv('RESULT_CACHE_MB', '512')) * 1024 * 1024,
+                    spill_dir=os.getenv('RESULT_CACHE_DIR') or None,
+                    spill_bytes=int(os.getenv('RESULT_CACHE_SPILL_MB', '2048')) * 1024 * 1024)
+# above this many rows the dashboards aggregate in SQL and only pull a
+# systematic sample of CHART_ROWS rows for row-level charts and tests
+PUSHDOWN_ROWS=200_000
+CHART_ROWS=50_000
+
+DTYPES={
+    'brand': 'category',
+    'availability': 'category',
+    'price': 'float32',
+    'discount': 'float32',
+    'rating': 'float32',
+}
+
+# columns each dashboard reads
+BRAND_INSIGHTS_COLUMNS=['product_id', 'product_name', 'brand', 'price', 'discount', 'availability', 'rating', 'number_of_ratings']
+SATISFACTION_COLUMNS=['product_name', 'brand', 'price', 'discount', 'availability', 'rating', 'number_of_ratings']
+
+# how long data_version() trusts its last read of the database
+VERSION_TTL=5
+_version=(None, 0.0)
+
+
+def _read_version():
+    # the newest record_id and the newest finished crawl job: new rows move
+    # the first as soon as they are written, by this process or a crawler
+    # worker on another dyno, and updates to existing rows the second once
+    # their job finishes
+    engine=get_engine()
+    ensure_jobs_table(engine)
+    with engine.connect() as conn:
+        return tuple(conn.execute(select(
+            select(func.max(cleandata.c.record_id)).scalar_subquery(),
+            select(func.max(jobs.c.finished_at)).where(jobs.c.status == DONE).scalar_subquery(),
+        )).one())
+
+
+def data_version():
+    # part of every memoised result's key, re-read from the database at most
+    # every VERSION_TTL seconds, so results computed before a write are no
+    # longer served once it lands
+    global _version
+    version, expires=_version
+    now=time.monotonic()
+    if now >= expires:
+        version=_read_version()
+        _version=(version, now + VERSION_TTL)
+    return version
+
+
+def invalidate():
+    # re-reads the version on the next call instead of after VERSION_TTL
+    global _version
+    _version=(_version[0], 0.0)
+
+
+def cached(ttl=CACHE_TTL):
+    # memoises a dashboard query or computation in RESULTS on the data
+    # version and its arguments, once for all sessions
+    return RESULTS.memoize(ttl, data_version)
+
+
+@cached()
+def _load(columns, brands, limit):
+    query=select(*[cleandata.c[name] for name in columns])
+    if brands:
+        query=query.where(cleandata.c.brand.in_(brands))
+    if limit:
+        total=row_count()
+        if total > limit:
+            query=query.where(cleandata.c.record_id % -(-total // limit) == 0)
+    with get_engine().connect() as conn:
+        frame=pd.read_sql(query, conn)
+    return frame.astype({c: t for c, t in DTYPES.items() if c in frame.columns})
+
+
+def load_products(columns, brands=None, limit=None):
+    # cached per column set / brand filter for every session on this server
+    # process until the data version changes. limit keeps roughly that many rows (every k-th record_id).
+    # The frame is shared between sessions and must not be modified in place.
+    return _load(tuple(columns), tuple(brands) if brands else None, limit)
+
+
+@cached()
+def row_count():
+    with get_engine().connect() as conn:
+        return conn.execute(select(func.count()).select_from(cleandata)).scalar()
+
+
+@cached()
+def distinct_brands():
+    with get_engine().connect() as conn:
+        return [b for b in conn.execute(select(cleandata.c.brand).distinct().order_by(cleandata.c.brand)).scalars() if b is not None]
+
+
+def brand_filter(selected, brands):
+    # the brand multiselect's choice as a query filter: None when no brand or
+    # every brand is selected, so the full list never becomes an IN (...)
+    # list or part of a cache key
+    if not selected or set(selected) >= set(brands):
+        return None
+    return list(selected)
+
+
+def use_pushdown():
+    return row_count() > PUSHDOWN_ROWS
+
+
+def select_run():
+    # sidebar choice between the live table and a saved scrape run;
+    # returns the run_id, or None for the live database
+    runs=list_runs()
+    labels=['Live database'] + [f"{run_date} · {query} · {run_id}" for run_date, query, run_id, _ in runs]
+    choice=st.sidebar.selectbox("Data source :", range(len(labels)), format_func=labels.__getitem__)
+    return runs[choice - 1][2] if choice else None
+
+
+@cached()
+def _load_run(run_id, columns, brands):
+    frame=load_snapshot(run_id=run_id, columns=columns, brands=brands)
+    return frame.astype({c: t for c, t in DTYPES.items() if c in frame.columns})
+
+
+def load_run(run_id, columns, brands=None):
+    # a saved run from the Parquet snapshot store, read memory-mapped with
+    # the brand filter pushed down to the row groups
+    return _load_run(run_id, tuple(columns), tuple(brands) if brands else None)
+
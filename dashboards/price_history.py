@@ -0,0 +1,66 @@
+import streamlit as st
+import plotly.express as px
+from db import get_engine
+from dashboards.data import cached
+from storage.history import history_products, product_history
+
+
+@cached()
+def _products(brand):
+    return history_products(get_engine(), brand)
+
+
+@cached()
+def _history(product_ids):
+    return product_history(get_engine(), product_ids)
+
+
+def render_tab(brands):
+    # price and stock trajectories of a few chosen products; only their own
+    # history rows are read
+    if not brands:
+        st.info("Select at least one brand to see its price history.")
+        return
+    brand=st.selectbox("Brand :", brands, key='history_brand')
+    products=_products(brand)
+    if products.empty:
+        st.info("No price history has been recorded for this brand yet.")
+        return
+    labels=dict(zip(products['product_id'], products['product_name'].fillna(products['product_id'])))
+    chosen=st.multiselect(
+        "Products :",
+        options=list(labels),
+        default=list(labels)[:5],
+        format_func=labels.get,
+        key='history_products'
+    )
+    if not chosen:
+        return
+
+    history=_history(tuple(chosen))
+    history=history.assign(product=history['product_id'].map(labels))
+    c1, c2=st.columns(2)
+    with c1:
+        fig=px.line(
+            history,
+            x='observed_at',
+            y='price',
+            color='product',
+            line_shape='hv',
+            markers=True,
+            title='PRICE OVER TIME',
+            labels={'observed_at': 'Observed', 'price': 'Price', 'product': 'Product'}
+        )
+        c1.plotly_chart(fig, width='stretch')
+    with c2:
+        fig=px.line(
+            history,
+            x='observed_at',
+            y='stock_left',
+            color='product',
+            line_shape='hv',
+            markers=True,
+            title='UNITS LEFT (gaps = in stock)',
+            labels={'observed_at': 'Observed', 'stock_left': 'Units Left', 'product': 'Product'}
+        )
+        c2.plotly_chart(fig, width='stretch')
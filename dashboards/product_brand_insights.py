@@ -1,14 +1,18 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
 import plotly.express as px
-import statsmodels
-from db import get_engine
-from scipy.stats import ttest_ind
+from dashboards.data import load_products, load_run, select_run, use_pushdown, distinct_brands, brand_filter, BRAND_INSIGHTS_COLUMNS, CHART_ROWS
+from dashboards.queries import product_kpis, top_product, availability_counts, brand_summary
+from dashboards.price_history import render_tab as render_history
+from dashboards.stats import stock_ttest
+from dashboards.charts import chart_key, histogram, histogram_figure, box_stats, box_figure
 
 def render():
-    engine=get_engine()
-    flipkart_products=pd.read_sql("SELECT * FROM scraped_cleandata", engine)
+    run=select_run()
+    pushdown=run is None and use_pushdown()
+    if run is not None:
+        flipkart_products=load_run(run, BRAND_INSIGHTS_COLUMNS)
+    elif not pushdown:
+        flipkart_products=load_products(BRAND_INSIGHTS_COLUMNS)
 
     st.set_page_config(layout='wide')
     st.title("📊 PRODUCT & BRAND INSIGHTS")
@@ -16,19 +20,30 @@ def render():
     st.sidebar.header("Filters")
 
     # brand filter
-    brands=flipkart_products['brand'].unique().tolist()
-    brands.sort()
+    if pushdown:
+        brands=distinct_brands()
+    else:
+        brands=flipkart_products['brand'].unique().tolist()
+        brands.sort()
     brand_selected=st.sidebar.multiselect(
         "Select Brand :",
         options=brands,
         default=brands
     )
+    selected=brand_filter(brand_selected, brands)
 
     # Applying filters
-    if brand_selected:
-        filtered=flipkart_products[flipkart_products['brand'].isin(brand_selected)]
+    key=chart_key(run, selected)
+    if pushdown:
+        # KPIs and aggregates run in SQL; row-level charts and tests use a sample
+        scope={'brands': selected}
+        filtered=load_products(BRAND_INSIGHTS_COLUMNS, selected, limit=CHART_ROWS)
     else:
-        filtered=flipkart_products.copy()
+        if selected:
+            filtered=flipkart_products[flipkart_products['brand'].isin(selected)]
+        else:
+            filtered=flipkart_products.copy()
+        scope={'frame': filtered}
 
     # KPIs
     def kpi_box(title, value):
@@ -57,90 +72,60 @@ def render():
         """, unsafe_allow_html=True
         )
 
+    kpis=product_kpis(**scope)
     col1, col2, col3, col4=st.columns(4)
     with col1:
-        kpi_box("Total Products", f"{filtered['product_id'].count():,}")
+        kpi_box("Total Products", f"{kpis['total_products']:,}")
     with col2:
-        kpi_box("Unique Brands",f"{filtered['brand'].nunique():,}")
+        kpi_box("Unique Brands",f"{kpis['unique_brands']:,}")
 
-    brand_counts = filtered['brand'].value_counts()
-    top_brand = brand_counts.idxmax()
-    top_brand_count = brand_counts.max()
     with col3:
-        kpi_box("Brand with the Most Product Variants", f"{top_brand} ({top_brand_count})")
+        kpi_box("Brand with the Most Product Variants", f"{kpis['top_brand']} ({kpis['top_brand_count']})")
 
-    total_products = filtered.shape[0]
-    instock_count = filtered[filtered['availability'] == "In Stock"].shape[0]
-    instock_percent = (instock_count / total_products) * 100
     with col4:
-        kpi_box("In-Stock Products %", f"{instock_percent:.1f}%")
+        kpi_box("In-Stock Products %", f"{kpis['instock_percent']:.1f}%")
 
     col5, col6, col7, col8 = st.columns(4)
     with col5:
-        kpi_box("Average Price",f"₹ {round(filtered['price'].mean(), 2):,}")
+        kpi_box("Average Price",f"₹ {round(kpis['avg_price'], 2):,}")
 
-    costliest = filtered.loc[filtered['price'].idxmax()]
+    costliest = top_product('price', **scope)
     with col6:
         kpi_box("Costliest Product", f"{costliest['product_name']} : {(costliest['price'])}")
     
     with col7:
-        kpi_box("Average discount", f"{round(filtered['discount'].mean(),2):.2f}%")
+        kpi_box("Average discount", f"{round(kpis['avg_discount'],2):.2f}%")
 
-    high_discount=filtered.loc[filtered['discount'].idxmax()]
+    high_discount=top_product('discount', **scope)
     with col8:
         kpi_box("Product with the Highest Average Discount",f"{high_discount['product_name']} : {high_discount['discount']}%")
 
     # Charts
     st.markdown('<h2 style="font-size:35px;">📈 Advanced Analytics</h2>', unsafe_allow_html=True)
-    tab1, tab2, tab3  = st.tabs(
-    ["Distribution Analysis", "Brand Analysis", "Statistical Analysis"] )
+    tab1, tab2, tab3, tab4  = st.tabs(
+    ["Distribution Analysis", "Brand Analysis", "Statistical Analysis", "Price & Stock History"] )
 
     with tab1:
         st.subheader("Price Distribution Analysis")
         c1, c2 = st.columns(2)
         with c1:
-            fig1 = px.histogram(
-            filtered,
-            x="price",
-            nbins=30, 
-            color_discrete_sequence=["green"]  
-        )
-            fig1.update_traces(
-            marker_line_color="black",   
-            marker_line_width=1          
-        )
+            fig1 = histogram_figure(histogram(filtered, 'price', 30, key), 'price')
         c1.plotly_chart(fig1, width='stretch')
 
         with c2:
-            fig2 = px.box(
-                filtered,
-                y="price",           
-            )
+            fig2 = box_figure(box_stats(filtered, 'price', key), 'price')
         c2.plotly_chart(fig2, width='stretch')
 
         st.subheader("Discount Distribution Analysis")
         c3, c4=st.columns(2)
         with c3:
-            fig1 = px.histogram(
-            filtered,
-            x="discount",
-            nbins=20,   
-            color_discrete_sequence=["green"]
-        )
-            fig1.update_traces(
-            marker_line_color="black",   
-            marker_line_width=1          
-        )
+            fig1 = histogram_figure(histogram(filtered, 'discount', 20, key), 'discount')
         c3.plotly_chart(fig1, width='stretch')
         with c4:
-            fig2 = px.box(
-                filtered,
-                y="discount",           
-            )
+            fig2 = box_figure(box_stats(filtered, 'discount', key), 'discount')
         c4.plotly_chart(fig2, width='stretch')
 
-        availability_status=filtered['availability'].value_counts().reset_index()
-        availability_status.columns = ['stock_status', 'count']
+        availability_status=availability_counts(**scope)
         c5, c6=st.columns(2)
         with c5:
             st.subheader("Stock Availability Distribution Analysis")
@@ -166,8 +151,10 @@ def render():
 
     with tab2:
         c6, c7=st.columns(2)
-        brand_avg=flipkart_products.groupby(by='brand').agg(avg_price=('price','mean'), avg_discount=('discount','mean'),
-                                                rating_count=('number_of_ratings','mean')).sort_values(by='avg_price', ascending=False).reset_index()
+        # the live database serves brand aggregates from brand_stats
+        brand_avg=(brand_summary(**({} if run is None else {'frame': flipkart_products}))
+                   [['brand', 'avg_price', 'avg_discount', 'rating_count']]
+                   .sort_values(by='avg_price', ascending=False).reset_index(drop=True))
         median_price = brand_avg['avg_price'].median()
         costly_brands = brand_avg[brand_avg['avg_price'] > median_price].sort_values(by='avg_price', ascending=False).reset_index(drop=True).round(2)
         costly_brands.columns=['Brand','Average Price','Average Discount','Popularity']
@@ -203,9 +190,8 @@ def render():
         with c10:
             st.markdown("<h3 style='font-size:20px;'>BRAND WISE PRODUCT PERCENTAGE GETTING OUT OF STOCK</h3>", 
                 unsafe_allow_html=True)
-            filtered['getting_outofstock_flag'] = filtered['availability'].apply(lambda x: 1 if x != 'In Stock' else 0)
-            only_left=filtered.groupby(by='brand').agg(stock_per=('getting_outofstock_flag','mean')).reset_index()
-            only_left['stock_per']=(only_left['stock_per']*100).round(2)
+            only_left=brand_summary(**({'brands': selected} if run is None else scope))[['brand', 'outofstock_percent']]
+            only_left['outofstock_percent']=only_left['outofstock_percent'].round(2)
             only_left.columns=['Brand','Getting Out of Stock%']
 
             only_left['label'] = only_left['Getting Out of Stock%'].apply(lambda x: f"{x:.1f}%" if x > 5 else "")
@@ -223,11 +209,8 @@ def render():
             c10.plotly_chart(fig, width='stretch')
     with tab3:
         col1, col2, col3 = st.columns(3)
-        flipkart_products['stock_flag'] = flipkart_products['availability'].apply(lambda x: 1 if x=='In Stock' else 0)
         with col1:
-            in_stock = flipkart_products[flipkart_products['stock_flag']==1]['price']
-            out_stock = flipkart_products[flipkart_products['stock_flag']==0]['price']
-            t_stat, p_value = ttest_ind(in_stock, out_stock)
+            t_stat, p_value = stock_ttest('price', run)
             st.markdown("<h3 style='font-size:20px;'>Effect of Price on Stock</h3>", unsafe_allow_html=True)
             st.write(f"T-statistic: {t_stat:.2f}, P-value: {p_value:.4f}")
             if p_value < 0.05:
@@ -236,9 +219,7 @@ def render():
                 st.info("Price does not significantly affect stock availability (p ≥ 0.05)")
 
         with col2:
-            in_stock = flipkart_products[flipkart_products['stock_flag']==1]['discount']
-            out_stock = flipkart_products[flipkart_products['stock_flag']==0]['discount']
-            t_stat, p_value = ttest_ind(in_stock, out_stock)
+            t_stat, p_value = stock_ttest('discount', run)
             st.markdown("<h3 style='font-size:20px;'>Effect of Discount on Stock</h3>", 
                 unsafe_allow_html=True)
             st.write(f"T-statistic: {t_stat:.2f}, P-value: {p_value:.4f}")
@@ -248,13 +229,14 @@ def render():
                 st.info("Discount does not significantly affect stock availability (p ≥ 0.05)")
 
         with col3:
-            in_stock = flipkart_products[flipkart_products['stock_flag']==1]['rating'].dropna()
-            out_stock = flipkart_products[flipkart_products['stock_flag']==0]['rating'].dropna()
-            t_stat, p_value = ttest_ind(in_stock, out_stock, nan_policy='omit')
+            t_stat, p_value = stock_ttest('rating', run)
             st.markdown("<h3 style='font-size:20px;'>Effect of Rating on Stock</h3>", 
                 unsafe_allow_html=True)
             st.write(f"T-statistic: {t_stat:.2f}, P-value: {p_value:.4f}")
             if p_value < 0.05:
                 st.success("Rating significantly affects stock availability (p < 0.05)")
             else:
-                st.info("Rating does not significantly affect stock availability (p ≥ 0.05)")
\ No newline at end of file
+                st.info("Rating does not significantly affect stock availability (p ≥ 0.05)")
+
+    with tab4:
+        render_history(brand_selected or brands)
\ No newline at end of file
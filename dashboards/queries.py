@@ -0,0 +1,137 @@
+import pandas as pd
+import numpy as np
+from sqlalchemy import select, func, case, cast, Float
+from db import get_engine
+from dashboards.data import cached
+from storage.cleandata import cleandata, brand_stats, ensure_table
+
+# KPI and brand aggregates for the dashboards. With brands=None they cover
+# every product, otherwise only the selected brands. Passing frame= computes
+# them in pandas on an already loaded frame; without it they run as
+# parameterised SQL and only the aggregated rows come back.
+
+c=cleandata.c
+IN_STOCK='In Stock'
+
+
+def _where(query, brands):
+    return query.where(c.brand.in_(brands)) if brands else query
+
+
+def _avg(column):
+    return func.avg(cast(column, Float))
+
+
+def _percent(condition):
+    return 100.0 * func.sum(case((condition, 1), else_=0)) / func.count()
+
+
+def _brand_frame(frame, brands):
+    return frame[frame['brand'].isin(brands)] if brands else frame
+
+
+def _read(query):
+    with get_engine().connect() as conn:
+        return pd.read_sql(query, conn)
+
+
+def _read_one(query):
+    with get_engine().connect() as conn:
+        row=conn.execute(query).mappings().first()
+    return dict(row) if row else None
+
+
+def product_kpis(brands=None, frame=None):
+    if frame is not None:
+        frame=_brand_frame(frame, brands)
+        brand_counts=frame['brand'].value_counts()
+        total=frame.shape[0]
+        return {
+            'total_products': int(frame['product_id'].count()) if 'product_id' in frame else total,
+            'unique_brands': int(frame['brand'].nunique()),
+            'top_brand': brand_counts.idxmax() if total else None,
+            'top_brand_count': int(brand_counts.max()) if total else 0,
+            'instock_percent': (frame['availability'] == IN_STOCK).sum() / total * 100 if total else float('nan'),
+            'avg_price': float(frame['price'].mean()),
+            'avg_discount': float(frame['discount'].mean()),
+            'avg_rating': float(frame['rating'].mean()),
+            'high_rated_percent': (frame['rating'] >= 4).sum() / total * 100 if total else float('nan'),
+        }
+    return _product_kpis_sql(tuple(brands) if brands else None)
+
+
+@cached()
+def _product_kpis_sql(brands):
+    totals=_read_one(_where(select(
+        func.count(c.product_id).label('total_products'),
+        func.count(func.distinct(c.brand)).label('unique_brands'),
+        _percent(c.availability == IN_STOCK).label('instock_percent'),
+        _avg(c.price).label('avg_price'),
+        _avg(c.discount).label('avg_discount'),
+        _avg(c.rating).label('avg_rating'),
+        _percent(c.rating >= 4).label('high_rated_percent'),
+    ), brands))
+    top=_read_one(_where(select(c.brand, func.count().label('n')), brands)
+                  .group_by(c.brand).order_by(func.count().desc(), c.brand).limit(1))
+    totals['top_brand']=top['brand'] if top else None
+    totals['top_brand_count']=top['n'] if top else 0
+    return totals
+
+
+def top_product(column, brands=None, frame=None):
+    # the product with the highest value in column, as {'product_name', column}
+    if frame is not None:
+        frame=_brand_frame(frame, brands)
+        index=frame[column].idxmax()
+        value=frame.at[index, column]
+        if isinstance(value, np.float32):
+            # keep float32 columns printing as 4.6, not 4.599999904632568
+            value=float(str(value))
+        return {'product_name': frame.at[index, 'product_name'], column: value}
+    return _top_product_sql(column, tuple(brands) if brands else None)
+
+
+@cached()
+def _top_product_sql(column, brands):
+    col=c[column]
+    return _read_one(_where(select(c.product_name, col), brands)
+                     .where(col.isnot(None)).order_by(col.desc(), c.record_id).limit(1))
+
+
+def availability_counts(brands=None, frame=None):
+    if frame is not None:
+        counts=_brand_frame(frame, brands)['availability'].value_counts()
+        counts=counts[counts > 0].reset_index()
+        counts.columns=['stock_status', 'count']
+        return counts
+    return _availability_counts_sql(tuple(brands) if brands else None)
+
+
+@cached()
+def _availability_counts_sql(brands):
+    return _read(_where(select(c.availability.label('stock_status'), func.count().label('count')), brands)
+                 .group_by(c.availability).order_by(func.count().desc()))
+
+
+def brand_summary(brands=None, frame=None):
+    # one row per brand: products, avg_price, avg_discount, rating_count
+    # (mean number_of_ratings), max_ratings, avg_rating, outofstock_percent.
+    # Without a frame the rows come precomputed from the brand_stats table.
+    if frame is not None:
+        frame=_brand_frame(frame, brands)
+        return (frame.assign(getting_outofstock_flag=(frame['availability'] != IN_STOCK) * 100.0)
+                     .groupby('brand', observed=True)
+                     .agg(products=('brand', 'size'), avg_price=('price', 'mean'), avg_discount=('discount', 'mean'),
+                          rating_count=('number_of_ratings', 'mean'), max_ratings=('number_of_ratings', 'max'),
+                          avg_rating=('rating', 'mean'), outofstock_percent=('getting_outofstock_flag', 'mean'))
+                     .reset_index())
+    return _brand_summary_sql(tuple(brands) if brands else None)
+
+
+@cached()
+def _brand_summary_sql(brands):
+    ensure_table(get_engine())
+    query=select(brand_stats).order_by(brand_stats.c.brand)
+    if brands:
+        query=query.where(brand_stats.c.brand.in_(brands))
+    return _read(query)
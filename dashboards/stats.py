@@ -0,0 +1,108 @@
+import pandas as pd
+import numpy as np
+from scipy import stats
+from sqlalchemy import select, func, cast, Float
+from db import get_engine
+from dashboards.data import cached, data_version, load_run
+from storage.cleandata import cleandata, brand_stats, ensure_table
+
+# One-way ANOVA and two-sample t-tests computed from per-group sufficient
+# statistics (count, sum, sum of squares) instead of the raw rows, so a test
+# costs O(groups) however many products there are. The live database serves
+# the brand groups from brand_stats, which every write keeps current, and
+# the availability groups from one GROUP BY; a saved run is reduced once
+# after loading. Results are memoised on the data version, the run and the
+# brand filter.
+
+c=cleandata.c
+IN_STOCK='In Stock'
+
+
+def moments(frame, by, columns):
+    # per-group n_<col>, sum_<col>, sumsq_<col> of the non-null values
+    values=frame[columns].astype('float64')
+    grouped=pd.concat([values.notna(), values, values ** 2], axis=1,
+                      keys=['n', 'sum', 'sumsq']).groupby(frame[by], observed=True).sum()
+    grouped.columns=[f"{stat}_{column}" for stat, column in grouped.columns]
+    return grouped
+
+
+def _sql_moments(by, columns, brands):
+    query=select(c[by], *[expr for column in columns for expr in (
+        func.count(c[column]).label(f"n_{column}"),
+        func.sum(cast(c[column], Float)).label(f"sum_{column}"),
+        func.sum(cast(c[column], Float) * cast(c[column], Float)).label(f"sumsq_{column}"),
+    )]).where(c[by].isnot(None)).group_by(c[by])
+    if brands:
+        query=query.where(c.brand.in_(brands))
+    with get_engine().connect() as conn:
+        return pd.read_sql(query, conn).set_index(by).astype('float64')
+
+
+def _brand_rating_moments(brands):
+    query=select(brand_stats.c.brand, brand_stats.c.rating_n.label('n_rating'),
+                 brand_stats.c.rating_sum.label('sum_rating'), brand_stats.c.rating_sumsq.label('sumsq_rating'))
+    if brands:
+        query=query.where(brand_stats.c.brand.in_(brands))
+    with get_engine().connect() as conn:
+        return pd.read_sql(query, conn).set_index('brand').astype('float64')
+
+
+@cached()
+def group_moments(by, columns, version, run=None, brands=None):
+    # version is data_version(); it only takes part in the cache key
+    if run is not None:
+        return moments(load_run(run, [by] + list(columns), brands), by, list(columns))
+    ensure_table(get_engine())
+    if by == 'brand' and tuple(columns) == ('rating',):
+        return _brand_rating_moments(brands)
+    return _sql_moments(by, columns, brands)
+
+
+def _anova_from(m, column):
+    n, total, sumsq=m[f"n_{column}"], m[f"sum_{column}"], m[f"sumsq_{column}"]
+    keep=n > 0
+    n, total, sumsq=n[keep], total[keep], sumsq[keep]
+    k, N=len(n), n.sum()
+    if k < 2 or N <= k:
+        return float('nan'), float('nan')
+    between=(total ** 2 / n).sum() - total.sum() ** 2 / N
+    within=(sumsq - total ** 2 / n).sum()
+    f_stat=(between / (k - 1)) / (within / (N - k)) if within > 0 else float('inf')
+    return float(f_stat), float(stats.f.sf(f_stat, k - 1, N - k))
+
+
+def _ttest_from(a, b):
+    # Student's t-test with pooled variance, as scipy's ttest_ind defaults to;
+    # a and b are (n, sum, sumsq)
+    (n1, s1, q1), (n2, s2, q2)=a, b
+    if n1 < 1 or n2 < 1 or n1 + n2 <= 2:
+        return float('nan'), float('nan')
+    df=n1 + n2 - 2
+    pooled=((q1 - s1 ** 2 / n1) + (q2 - s2 ** 2 / n2)) / df
+    t_stat=(s1 / n1 - s2 / n2) / np.sqrt(pooled * (1 / n1 + 1 / n2))
+    return float(t_stat), float(2 * stats.t.sf(abs(t_stat), df))
+
+
+@cached()
+def _anova(column, by, version, run, brands):
+    return _anova_from(group_moments(by, (column,), version, run, brands), column)
+
+
+def anova(column, by, run=None, brands=None):
+    # (F, p) of column grouped by the by column, like stats.f_oneway
+    return _anova(column, by, data_version(), run, tuple(brands) if brands else None)
+
+
+@cached()
+def _stock_ttest(column, version, run, brands):
+    m=group_moments('availability', (column,), version, run, brands)
+    fields=[f"n_{column}", f"sum_{column}", f"sumsq_{column}"]
+    in_stock=m.index == IN_STOCK
+    return _ttest_from(tuple(m.loc[in_stock, fields].sum()), tuple(m.loc[~in_stock, fields].sum()))
+
+
+def stock_ttest(column, run=None, brands=None):
+    # (t, p) of column for in-stock against out-of-stock products, like
+    # ttest_ind(in_stock, out_stock) with missing values left out
+    return _stock_ttest(column, data_version(), run, tuple(brands) if brands else None)
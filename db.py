@@ -1,7 +1,7 @@
 import streamlit as st
 import os
-from sqlalchemy import create_engine
 from dotenv import load_dotenv
+from storage.engine import make_engine, POOL_SIZE, MAX_OVERFLOW, POOL_TIMEOUT, POOL_RECYCLE, STATEMENT_TIMEOUT
 
 load_dotenv("encrypted.env")
 
@@ -10,7 +10,23 @@ password=os.getenv("azure_password")
 server=os.getenv("azure_server")
 database=os.getenv("azure_db")
 
+# DATABASE_URL points the app at another database instead, e.g.
+# sqlite:///local.db for development and benchmarking
+DATABASE_URL=os.getenv("DATABASE_URL")
+
+
+def _setting(name, default):
+    return type(default)(os.getenv(name, default))
+
+
 @st.cache_resource
 def get_engine():
-    conn_str=f"mssql+pymssql://{username}:{password}@{server}:1433/{database}"
-    return create_engine(conn_str)
\ No newline at end of file
+    conn_str=DATABASE_URL or f"mssql+pymssql://{username}:{password}@{server}:1433/{database}"
+    return make_engine(
+        conn_str,
+        pool_size=_setting("DB_POOL_SIZE", POOL_SIZE),
+        max_overflow=_setting("DB_MAX_OVERFLOW", MAX_OVERFLOW),
+        pool_timeout=_setting("DB_POOL_TIMEOUT", POOL_TIMEOUT),
+        pool_recycle=_setting("DB_POOL_RECYCLE", POOL_RECYCLE),
+        statement_timeout=_setting("DB_STATEMENT_TIMEOUT", STATEMENT_TIMEOUT),
+    )
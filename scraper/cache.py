@@ -0,0 +1,122 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+
+def normalize_url(url):
+    # same page, same key: lower-case scheme/host, sorted query, no fragment
+    parts=urlsplit(url.strip())
+    query=urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or '/', query, ''))
+
+
+class CachedPage:
+    def __init__(self, html, etag, last_modified, fetched_at, ttl):
+        self.html=html
+        self.etag=etag
+        self.last_modified=last_modified
+        self.fetched_at=fetched_at
+        self.fresh=time.time() - fetched_at < ttl
+
+    def validators(self):
+        headers={}
+        if self.etag:
+            headers['If-None-Match']=self.etag
+        if self.last_modified:
+            headers['If-Modified-Since']=self.last_modified
+        return headers
+
+
+class PageCache:
+    # Raw page HTML stored zlib-compressed under its sha256 (identical pages
+    # share one blob), with a small sqlite index from normalised URL to blob,
+    # validators and timestamps. Entries older than ttl are revalidated; the
+    # least recently used ones are evicted once blobs exceed max_bytes.
+    def __init__(self, directory='.cache/pages', ttl=24 * 3600, max_bytes=200 * 1024 * 1024):
+        self.directory=directory
+        self.ttl=ttl
+        self.max_bytes=max_bytes
+        self._lock=threading.Lock()
+        os.makedirs(os.path.join(directory, 'blobs'), exist_ok=True)
+        self._db=sqlite3.connect(os.path.join(directory, 'index.sqlite'), check_same_thread=False)
+        self._db.execute('''CREATE TABLE IF NOT EXISTS pages (
+            url TEXT PRIMARY KEY, digest TEXT NOT NULL, size INTEGER NOT NULL,
+            etag TEXT, last_modified TEXT, fetched_at REAL NOT NULL, accessed_at REAL NOT NULL)''')
+        self._db.execute('CREATE INDEX IF NOT EXISTS pages_accessed ON pages (accessed_at)')
+        self._db.commit()
+
+    def _blob_path(self, digest):
+        return os.path.join(self.directory, 'blobs', digest[:2], digest + '.z')
+
+    def get(self, url):
+        key=normalize_url(url)
+        with self._lock:
+            row=self._db.execute('SELECT digest, etag, last_modified, fetched_at FROM pages WHERE url=?', (key,)).fetchone()
+            if row is None:
+                return None
+            try:
+                with open(self._blob_path(row[0]), 'rb') as f:
+                    html=zlib.decompress(f.read()).decode('utf-8')
+            except (OSError, zlib.error):
+                self._db.execute('DELETE FROM pages WHERE url=?', (key,))
+                self._db.commit()
+                return None
+            self._db.execute('UPDATE pages SET accessed_at=? WHERE url=?', (time.time(), key))
+            self._db.commit()
+        return CachedPage(html, row[1], row[2], row[3], self.ttl)
+
+    def put(self, url, html, headers=None):
+        headers=headers or {}
+        data=html.encode('utf-8')
+        digest=hashlib.sha256(data).hexdigest()
+        path=self._blob_path(digest)
+        compressed=zlib.compress(data, 6)
+        now=time.time()
+        with self._lock:
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp=f"{path}.{threading.get_ident()}.tmp"
+                with open(tmp, 'wb') as f:
+                    f.write(compressed)
+                os.replace(tmp, path)
+            self._db.execute('INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?)',
+                             (normalize_url(url), digest, len(compressed), headers.get('ETag'),
+                              headers.get('Last-Modified'), now, now))
+            self._db.commit()
+            self._evict()
+
+    def revalidated(self, url):
+        # a 304 for a stale entry: it is fresh again for another ttl
+        now=time.time()
+        with self._lock:
+            self._db.execute('UPDATE pages SET fetched_at=?, accessed_at=? WHERE url=?', (now, now, normalize_url(url)))
+            self._db.commit()
+
+    def _evict(self):
+        rows=self._db.execute('SELECT url, digest, size FROM pages ORDER BY accessed_at DESC').fetchall()
+        kept=set()
+        total=0
+        evicted=[]
+        for url, digest, size in rows:
+            if digest not in kept:
+                if total + size > self.max_bytes:
+                    evicted.append((url, digest))
+                    continue
+                kept.add(digest)
+                total+=size
+        if not evicted:
+            return
+        self._db.executemany('DELETE FROM pages WHERE url=?', [(url,) for url, _ in evicted])
+        self._db.commit()
+        for digest in {digest for _, digest in evicted} - kept:
+            try:
+                os.remove(self._blob_path(digest))
+            except OSError:
+                pass
+
+    def close(self):
+        self._db.close()
@@ -0,0 +1,65 @@
+import pandas as pd
+from scraper.extract import RAW_COLUMNS
+
+
+def clean_products(raw_data):
+    # the Home page "Data Cleaning" rules: snake_case columns, numeric
+    # price/rating/number_of_ratings, missing discount as 0, no duplicate rows
+    raw_data=raw_data.copy()
+    raw_data.columns=raw_data.columns.str.strip().str.lower().str.replace(' ', '_')
+
+    raw_data['price']=pd.to_numeric(raw_data['price'], errors='coerce')
+    raw_data['rating']=pd.to_numeric(raw_data['rating'], errors='coerce')
+    raw_data['number_of_ratings'] = (raw_data['number_of_ratings']
+                                        .astype(str)
+                                        .str.replace(',', '', regex=False)
+                                        .str.strip()
+                                        .replace(['nan', 'None', ''], None)
+                                        .astype('Int64')
+                                    )
+    raw_data['discount']=raw_data['discount'].fillna(0)
+    raw_data.drop_duplicates(inplace=True, ignore_index=True)
+    return raw_data
+
+
+try:
+    import pyarrow
+    STRING='string[pyarrow]'
+except ImportError:
+    STRING='string'
+
+PRODUCT_ID_PAT=r'/p/(\w+)'
+FIRST_WORD_PAT=r'^\s*(\S+)'
+DIGITS_PAT=r'(\d+)'
+# first whitespace-separated token before any '&', e.g. "12,345 Ratings & 99 Reviews"
+RATINGS_COUNT_PAT=r'^[^&\S]*([^&\s]+)'
+
+
+def normalize_raw(raw):
+    # Vectorised equivalent of build_record() followed by clean_products():
+    # takes the raw text columns from parse_raw_products (see RAW_COLUMNS)
+    # and returns the cleaned, typed frame in a single pass over each column.
+    raw=raw.reindex(columns=RAW_COLUMNS)
+    text={column: raw[column].astype(STRING) for column in RAW_COLUMNS}
+
+    name=text['name']
+    stock=text['stock']
+    in_stock=~(stock.str.contains('Only', regex=False) & stock.str.contains('left', regex=False)).fillna(False).astype(bool)
+    ratings_count=(text['ratings'].str.extract(RATINGS_COUNT_PAT, expand=False)
+                                  .str.replace(',', '', regex=False))
+
+    cleaned=pd.DataFrame({
+        'product_id': text['href'].str.extract(PRODUCT_ID_PAT, expand=False).astype(object),
+        'product_name': name.astype(object),
+        'brand': name.str.extract(FIRST_WORD_PAT, expand=False).str.lower().astype(object),
+        'price': pd.to_numeric(text['price'].str.replace('₹', '', regex=False)
+                                            .str.replace(',', '', regex=False)
+                                            .str.strip(), errors='coerce').astype('float64'),
+        'discount': pd.to_numeric(text['discount'].str.extract(DIGITS_PAT, expand=False), errors='coerce')
+                      .astype('float64').fillna(0),
+        'availability': stock.where(~in_stock, 'In Stock').astype(object),
+        'rating': pd.to_numeric(text['rating'], errors='coerce').astype('float64'),
+        'number_of_ratings': pd.to_numeric(ratings_count, errors='coerce').astype('Int64'),
+    })
+    cleaned.drop_duplicates(inplace=True, ignore_index=True)
+    return cleaned
@@ -0,0 +1,240 @@
+import re
+import time
+from bs4 import BeautifulSoup
+
+try:
+    from lxml import etree, html as lxml_html
+except ImportError:
+    lxml_html=None
+
+from scraper.selectors import FIELDS, BUILTIN, get_selectors, registry
+
+PRODUCT_ID_RE=re.compile(r'/p/(\w+)')
+DIGITS_RE=re.compile(r'(\d+)')
+
+
+RAW_COLUMNS=list(FIELDS) + ['href']
+
+
+def build_record(texts, href):
+    # texts maps each FIELDS key to the card's stripped text, or None when
+    # the element is missing; href is the first link's href or None
+    name_text=texts.get('name')
+
+    clean_price=None
+    if texts.get('price') is not None:
+        clean_price=texts['price'].replace('₹', '').replace(',', '').strip()
+
+    product_id=None
+    if href is not None:
+        match=PRODUCT_ID_RE.search(href)
+        if match:
+            product_id=match.group(1)
+
+    discount=None
+    if texts.get('discount') is not None:
+        match=DIGITS_RE.search(texts['discount'])
+        if match:
+            discount=int(match.group(1))
+
+    brand_name=None
+    if name_text:
+        n_parts=name_text.split()
+        if len(n_parts)>0:
+            brand_name=n_parts[0].lower()
+
+    stock='In Stock'
+    stock_text=texts.get('stock')
+    if stock_text and "Only" in stock_text and "left" in stock_text:
+        stock=stock_text
+
+    ratings_count=None
+    if texts.get('ratings') is not None:
+        r_parts=texts['ratings'].split('&')[0].split()
+        if r_parts:
+            ratings_count=r_parts[0]
+
+    return {
+        'Product ID': product_id,
+        'Product Name': name_text,
+        'Brand': brand_name,
+        'Price': clean_price,
+        'Discount': discount,
+        'Availability': stock,
+        'Rating': texts.get('rating'),
+        'Number of Ratings': ratings_count
+    }
+
+
+class SoupBackend:
+    name='bs4'
+
+    def __init__(self, selectors=BUILTIN):
+        self.selectors=selectors
+
+    def parse(self, html):
+        return [build_record(row, row['href']) for row in self.parse_raw(html)]
+
+    def parse_raw(self, html, timings=None):
+        start=time.perf_counter()
+        soup=BeautifulSoup(html, 'html.parser')
+        parsed=time.perf_counter()
+        container, card=self.selectors.container, self.selectors.card
+        main_container=soup.find(container[0], class_=container[1])
+        product=main_container.find_all(card[0], class_=card[1]) if main_container else []
+
+        rows=[]
+        for p in product:
+            texts={}
+            for field, selector in self.selectors.fields.items():
+                found=p.find(selector[0], class_=selector[1]) if selector else None
+                texts[field]=found.get_text(strip=True) if found else None
+            link_tag=p.find('a', href=True)
+            texts['href']=link_tag['href'] if link_tag else None
+            rows.append(texts)
+        if timings is not None:
+            timings.update({'parse.html': parsed - start, 'parse.extract': time.perf_counter() - parsed})
+        return rows
+
+
+def _class_test(cls):
+    if ' ' in cls:
+        return lambda value: value == cls
+    return lambda value: value is not None and cls in value.split()
+
+
+def _class_xpath(tag, cls):
+    if ' ' in cls:
+        return f"{tag}[@class='{cls}']"
+    return f"{tag}[contains(concat(' ', normalize-space(@class), ' '), ' {cls} ')]"
+
+
+class LxmlBackend:
+    # selectors are compiled once; each card's subtree is then walked a single
+    # time, taking the first element that matches each field
+    name='lxml'
+
+    def __init__(self, selectors=BUILTIN):
+        if lxml_html is None:
+            raise ImportError("lxml is not installed")
+        self.selectors=selectors
+        self.parser=lxml_html.HTMLParser(encoding='utf-8')
+        self.cards=etree.XPath(f"(//{_class_xpath(*selectors.container)})[1]//{_class_xpath(*selectors.card)}")
+        self.by_tag={}
+        self.wanted=0
+        for field, selector in selectors.fields.items():
+            if selector:
+                self.by_tag.setdefault(selector[0], []).append((field, _class_test(selector[1])))
+                self.wanted+=1
+
+    def parse(self, html):
+        return [build_record(row, row['href']) for row in self.parse_raw(html)]
+
+    def parse_raw(self, html, timings=None):
+        start=time.perf_counter()
+        if isinstance(html, str):
+            html=html.encode('utf-8')
+        if not html.strip():
+            # lxml refuses an empty document; it simply has no cards
+            return []
+        root=lxml_html.document_fromstring(html, parser=self.parser)
+        parsed=time.perf_counter()
+        rows=[self.parse_card(card) for card in self.cards(root)]
+        if timings is not None:
+            timings.update({'parse.html': parsed - start, 'parse.extract': time.perf_counter() - parsed})
+        return rows
+
+    def parse_card(self, card):
+        # like find(), only the first matching element counts, even if empty
+        texts=dict.fromkeys(FIELDS)
+        found=set()
+        href=None
+        remaining=self.wanted + 1
+        for el in card.iterdescendants():
+            tag=el.tag
+            if tag == 'a' and href is None and el.get('href') is not None:
+                href=el.get('href')
+                remaining-=1
+            for field, test in self.by_tag.get(tag, ()):
+                if field not in found and test(el.get('class')):
+                    found.add(field)
+                    texts[field]=''.join(t.strip() for t in el.itertext())
+                    remaining-=1
+            if not remaining:
+                break
+        texts['href']=href
+        return texts
+
+
+BACKENDS={'bs4': SoupBackend, 'lxml': LxmlBackend}
+_instances={}
+
+
+def get_backend(name=None, selectors=None):
+    # None picks the fastest installed backend, falling back to BeautifulSoup;
+    # selectors is a registered version or SelectorSet, None the newest
+    if name is None:
+        name='lxml' if lxml_html is not None else 'bs4'
+    selectors=get_selectors(selectors)
+    key=(name, selectors.version)
+    if key not in _instances:
+        _instances[key]=BACKENDS[name](selectors)
+    return _instances[key]
+
+
+def parse_products(html, backend=None, selectors=None):
+    return get_backend(backend, selectors).parse(html)
+
+
+def parse_raw_products(html, backend=None, selectors=None):
+    # the stripped text of every field plus the link href, one dict per
+    # card, for scraper.clean.normalize_raw to type in bulk
+    return get_backend(backend, selectors).parse_raw(html)
+
+
+class ParsedPage(list):
+    # parse_raw_products() rows carrying the page's parse timings; a plain
+    # list subclass so it pickles back from parser processes and an empty
+    # page is still falsy
+    timings={}
+
+
+def profile_raw_products(html, backend=None, selectors=None):
+    # parse_raw_products() with 'parse.html' / 'parse.extract' seconds in .timings
+    timings={}
+    page=ParsedPage(get_backend(backend, selectors).parse_raw(html, timings))
+    page.timings=timings
+    return page
+
+
+class LayoutChanged(Exception):
+    def __init__(self, rates):
+        tried='; '.join(f"{version}: {_describe(r)}" for version, r in rates.items())
+        super().__init__(f"no selector set matches the page layout ({tried})")
+        self.rates=rates
+
+
+def _describe(rates):
+    return ', '.join(f"{k} {v:.0%}" if k != 'cards' else f"{v} cards" for k, v in rates.items())
+
+
+def hit_rates(rows):
+    # {'cards': n, field: share of cards that have it, ..., 'href': ...}
+    rates={'cards': len(rows)}
+    for field in RAW_COLUMNS:
+        rates[field]=sum(row.get(field) is not None for row in rows) / len(rows) if rows else 0.0
+    return rates
+
+
+def match_selectors(html, backend=None):
+    # Fingerprints a result page against every registered selector set,
+    # newest first, and returns (selectors, hit_rates) for the first one
+    # that finds cards and reaches its min_hit_rate on every listed field.
+    # Raises LayoutChanged with each set's rates when none does.
+    tried={}
+    for selectors in registry():
+        rates=hit_rates(get_backend(backend, selectors).parse_raw(html))
+        tried[selectors.version]=rates
+        if rates['cards'] and all(rates.get(field, 0.0) >= rate for field, rate in selectors.min_hit_rate.items()):
+            return selectors, rates
+    raise LayoutChanged(tried)
@@ -0,0 +1,298 @@
+import random
+import re
+import threading
+import time
+from collections import deque
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from scraper.metrics import NULL_METRICS
+
+HEADERS={ "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36 Edg/142.0.0.0"}
+
+RETRY_STATUS={429, 500, 502, 503, 504}
+# responses that mean "slow down" rather than "failed"
+THROTTLE_STATUS={429, 503}
+
+
+class PageFetchError(Exception):
+    def __init__(self, page, cause):
+        super().__init__(f"page {page}: {cause}")
+        self.page=page
+        self.cause=cause
+
+
+def page_url(url, page):
+    if "page=" in url:
+        return re.sub(r'page=\d+', f'page={page}', url)
+    return url + f"&page={page}"
+
+
+class HostRateLimiter:
+    # token bucket per host, shared by every worker thread
+    def __init__(self, rate=1.0, burst=1):
+        self.rate=rate
+        self.burst=burst
+        self._lock=threading.Lock()
+        self._buckets={}
+        self._stalled={}
+
+    def _rate(self, host):
+        return self.rate
+
+    def acquire(self, url, stop=None):
+        host=urlsplit(url).netloc
+        while True:
+            with self._lock:
+                now=time.monotonic()
+                rate=self._rate(host)
+                tokens, last=self._buckets.get(host, (self.burst, now))
+                tokens=min(self.burst, tokens + (now - last) * rate)
+                if tokens >= 1:
+                    self._buckets[host]=(tokens - 1, now)
+                    return True
+                self._buckets[host]=(tokens, now)
+                wait=(1 - tokens) / rate
+                self._stalled[host]=self._stalled.get(host, 0.0) + wait
+            if stop is None:
+                time.sleep(wait)
+            elif stop.wait(wait):
+                return False
+
+    def observe(self, url, latency, status):
+        pass
+
+    def metrics(self):
+        # {host: {'rate': requests/s now, 'stall_seconds': time spent waiting for
+        # tokens, summed over the threads that waited}}
+        with self._lock:
+            return {host: {'rate': self._rate(host), 'stall_seconds': round(self._stalled.get(host, 0.0), 3)}
+                    for host in self._buckets}
+
+
+class AdaptiveRateLimiter(HostRateLimiter):
+    # AIMD rate per host: a 429/503 halves it and drains the bucket, a
+    # latency average above slow_factor x the best one seen trims it by a
+    # fifth, and healthy responses add step requests/s back up to max_rate.
+    # At most one cut and one step up per cooldown seconds, so one burst of
+    # throttled responses from concurrent requests counts once and the rate
+    # recovers gradually.
+    def __init__(self, rate=1.0, burst=1, min_rate=0.05, max_rate=None, step=None, slow_factor=2.0,
+                 cooldown=5.0):
+        super().__init__(rate, burst)
+        self.min_rate=min_rate
+        self.max_rate=max_rate or rate * 4
+        self.step=step or rate * 0.05
+        self.slow_factor=slow_factor
+        self.cooldown=cooldown
+        self._rates={}
+        self._latency={}
+        self._best={}
+        self._cut_at={}
+        self._raised_at={}
+        self._throttled={}
+
+    def _rate(self, host):
+        return self._rates.get(host, self.rate)
+
+    def observe(self, url, latency, status):
+        host=urlsplit(url).netloc
+        with self._lock:
+            now=time.monotonic()
+            rate=self._rate(host)
+            cooled=now - self._cut_at.get(host, -self.cooldown) >= self.cooldown
+            if status in THROTTLE_STATUS:
+                self._throttled[host]=self._throttled.get(host, 0) + 1
+                if cooled:
+                    self._rates[host]=max(self.min_rate, rate / 2)
+                    self._buckets[host]=(0.0, now)
+                    self._cut_at[host]=now
+                return
+            if latency is None:
+                return
+            average=0.8 * self._latency.get(host, latency) + 0.2 * latency
+            self._latency[host]=average
+            self._best[host]=min(self._best.get(host, average), average)
+            if average > self.slow_factor * self._best[host]:
+                if cooled:
+                    self._rates[host]=max(self.min_rate, rate * 0.8)
+                    self._cut_at[host]=now
+            elif cooled and now - self._raised_at.get(host, -self.cooldown) >= self.cooldown:
+                self._rates[host]=min(self.max_rate, rate + self.step)
+                self._raised_at[host]=now
+
+    def metrics(self):
+        metrics=super().metrics()
+        with self._lock:
+            for host, values in metrics.items():
+                values.update(throttled=self._throttled.get(host, 0),
+                              latency=round(self._latency.get(host, 0.0), 3))
+        return metrics
+
+
+def retry_after_seconds(value):
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when=parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when=when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class FetchClient:
+    # pooled keep-alive session; retries connection errors, timeouts and
+    # RETRY_STATUS responses with exponential backoff + full jitter, and
+    # waits at least as long as the server's Retry-After header asks. With a
+    # limiter every attempt, retries included, takes a token from it and
+    # reports its latency and status back. metrics (scraper.metrics) gets the
+    # time to response headers (DNS, connect and server time) and the
+    # download time of each response, with request, status and byte counts.
+    def __init__(self, headers=None, timeout=30, retries=4, backoff=1.0, max_backoff=60, pool_size=10,
+                 limiter=None, metrics=NULL_METRICS):
+        self.timeout=timeout
+        self.limiter=limiter
+        self.metrics=metrics
+        self.retries=retries
+        self.backoff=backoff
+        self.max_backoff=max_backoff
+        self.session=requests.Session()
+        self.session.headers.update(headers or HEADERS)
+        adapter=HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def delay(self, attempt, retry_after=None):
+        wait=random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+        server_wait=retry_after_seconds(retry_after)
+        if server_wait is not None:
+            wait=max(wait, min(server_wait, self.max_backoff))
+        return wait
+
+    def get(self, url, stop=None, **kwargs):
+        # None when stop is set while waiting for the limiter
+        kwargs.setdefault('timeout', self.timeout)
+        for attempt in range(self.retries + 1):
+            if self.limiter and not self.limiter.acquire(url, stop):
+                return None
+            start=time.monotonic()
+            try:
+                response=self.session.get(url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if self.limiter and isinstance(e, requests.Timeout):
+                    self.limiter.observe(url, time.monotonic() - start, None)
+                if attempt == self.retries:
+                    raise
+                time.sleep(self.delay(attempt))
+                continue
+            total=time.monotonic() - start
+            if self.limiter:
+                self.limiter.observe(url, total, response.status_code)
+            if self.metrics.enabled:
+                wait=response.elapsed.total_seconds()
+                self.metrics.observe('fetch.wait', wait)
+                self.metrics.observe('fetch.download', max(0.0, total - wait))
+                self.metrics.add('requests')
+                self.metrics.add(f"status_{response.status_code}")
+                self.metrics.add('bytes', len(response.content))
+            if response.status_code in RETRY_STATUS and attempt < self.retries:
+                response.close()
+                time.sleep(self.delay(attempt, response.headers.get('Retry-After')))
+                continue
+            response.raise_for_status()
+            return response
+
+    def close(self):
+        self.session.close()
+
+
+class ConcurrentFetcher:
+    # cache is an optional scraper.cache.PageCache. Fresh cached pages skip
+    # the network, stale ones are revalidated with ETag/Last-Modified, and
+    # offline=True replays only from the cache: an uncached page is fetched
+    # as None, which ends the crawl there. Requests go through an
+    # AdaptiveRateLimiter starting at rate requests/s per host unless another
+    # limiter is given.
+    def __init__(self, max_workers=4, rate=1.0, burst=1, timeout=30, headers=None, client=None,
+                 cache=None, offline=False, limiter=None, metrics=NULL_METRICS):
+        self.max_workers=max_workers
+        self.limiter=limiter or AdaptiveRateLimiter(rate, burst)
+        self.metrics=metrics
+        self.client=client or FetchClient(headers, timeout, pool_size=max_workers)
+        self.client.limiter=self.limiter
+        self.client.metrics=metrics
+        self.cache=cache
+        self.offline=offline
+
+    def fetch(self, url, stop=None):
+        cached=self.cache.get(url) if self.cache else None
+        if cached and (cached.fresh or self.offline):
+            self.metrics.add('cache_hits')
+            return cached.html
+        if self.offline:
+            return None
+        response=self.client.get(url, stop=stop, headers=cached.validators() if cached else None)
+        if response is None:
+            return None
+        if cached and response.status_code == 304:
+            self.metrics.add('cache_revalidated')
+            self.cache.revalidated(url)
+            return cached.html
+        if self.cache:
+            self.cache.put(url, response.text, response.headers)
+        return response.text
+
+    def pages(self, url, max_pages=None):
+        # yields (page, html) in page order while keeping a bounded window of
+        # requests in flight, up to the first page fetched as None (offline
+        # and not cached, or cancelled); closing the generator cancels what
+        # is left
+        stop=threading.Event()
+        pool=ThreadPoolExecutor(max_workers=self.max_workers)
+        pending=deque()
+        next_page=1
+
+        def fill():
+            nonlocal next_page
+            while len(pending) < self.max_workers * 2 and (max_pages is None or next_page <= max_pages):
+                pending.append((next_page, pool.submit(self.fetch, page_url(url, next_page), stop)))
+                next_page+=1
+
+        try:
+            fill()
+            while pending:
+                page, future=pending.popleft()
+                try:
+                    html=future.result()
+                except requests.RequestException as e:
+                    raise PageFetchError(page, e) from e
+                if html is None:
+                    return
+                yield page, html
+                fill()
+        finally:
+            stop.set()
+            for _, future in pending:
+                future.cancel()
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def crawl(self, url, parse, max_pages=None):
+        # yields (page, records) and stops at the first page parse() returns
+        # nothing for. A page that still fails after retries raises
+        # PageFetchError, so the caller keeps every record yielded before it.
+        with closing(self.pages(url, max_pages)) as pages:
+            for page, html in pages:
+                records=parse(html)
+                if not records:
+                    break
+                yield page, records
@@ -0,0 +1,90 @@
+import hashlib
+import math
+from urllib.parse import quote_plus
+from scraper.cache import normalize_url
+from scraper.extract import PRODUCT_ID_RE
+
+SEARCH_URL='https://www.flipkart.com/search?q={}'
+
+
+def search_url(query):
+    # a search URL is kept as is, anything else is treated as keywords
+    query=query.strip()
+    if query.startswith(('http://', 'https://')):
+        return query
+    return SEARCH_URL.format(quote_plus(query))
+
+
+def product_key(record):
+    # product_id of a raw record (href) or of a build_record() dict
+    if record.get('Product ID'):
+        return record['Product ID']
+    match=PRODUCT_ID_RE.search(record.get('href') or '')
+    return match.group(1) if match else None
+
+
+class BloomFilter:
+    # fixed-size seen-set: no false negatives, about error_rate false
+    # positives once capacity keys are in. A million product ids at 0.1%
+    # take under 2 MB instead of the ~100 MB a Python set of strings needs.
+    def __init__(self, capacity=1_000_000, error_rate=0.001):
+        self.size=max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes=max(1, round(self.size / capacity * math.log(2)))
+        self.bits=bytearray((self.size + 7) // 8)
+        self.count=0
+
+    def _positions(self, key):
+        # double hashing: k positions from the two halves of one digest
+        digest=hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1=int.from_bytes(digest[:8], 'little')
+        h2=int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def __contains__(self, key):
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(key))
+
+    def add(self, key):
+        # True when key was not seen before
+        new=False
+        for p in self._positions(key):
+            mask=1 << (p & 7)
+            if not self.bits[p >> 3] & mask:
+                self.bits[p >> 3]|=mask
+                new=True
+        self.count+=new
+        return new
+
+    def __len__(self):
+        return self.count
+
+
+class Frontier:
+    # Shared state of a batch crawl over several searches: the search URLs
+    # to crawl, with duplicates after normalisation dropped, and a Bloom
+    # filter of the product ids already yielded, so a product found by
+    # several overlapping searches is cleaned and written once.
+    def __init__(self, queries, capacity=1_000_000, error_rate=0.001):
+        self.queries=[]
+        queued=set()
+        for query in queries:
+            url=search_url(query)
+            if query.strip() and normalize_url(url) not in queued:
+                queued.add(normalize_url(url))
+                self.queries.append(url)
+        self.products=BloomFilter(capacity, error_rate)
+        self.skipped_products=0
+        self.errors=[]
+        # "<url> after page N" for searches left early on stale pages
+        self.left_early=[]
+
+    def unseen(self, records):
+        # records whose product was not yielded before; ones without an id
+        # cannot be matched and are kept
+        fresh=[]
+        for record in records:
+            key=product_key(record)
+            if key is None or self.products.add(key):
+                fresh.append(record)
+            else:
+                self.skipped_products+=1
+        return fresh
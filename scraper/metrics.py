@@ -0,0 +1,118 @@
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from scraper.selectors import get_selectors
+
+# Per-run instrumentation: stage timers, counters and byte totals, plus the
+# number of cards each field's selector found nothing in, labelled with the
+# class of the selector set that parsed them, so a renamed class shows up as
+# a column of misses. Code takes a metrics object and calls it
+# unconditionally; NULL_METRICS makes every call a no-op when disabled.
+
+STAGES=['fetch.wait', 'fetch.download', 'parse.html', 'parse.extract', 'clean',
+        'write.sql', 'write.history', 'write.snapshot', 'write.csv']
+
+
+class RunMetrics:
+    enabled=True
+
+    def __init__(self):
+        self.started=time.time()
+        self._lock=threading.Lock()
+        self.timers={}
+        self.counters={}
+        self.missing={}
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            total, count=self.timers.get(stage, (0.0, 0))
+            self.timers[stage]=(total + seconds, count + 1)
+
+    @contextmanager
+    def timer(self, stage):
+        start=time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def add(self, counter, value=1):
+        with self._lock:
+            self.counters[counter]=self.counters.get(counter, 0) + value
+
+    def cards(self, rows, selectors=None):
+        # counts the parsed cards and the selectors that matched nothing;
+        # selectors is the SelectorSet or version that parsed rows, None the newest
+        labels={field: f"{field}:{selector[1] if selector else ''}"
+                for field, selector in get_selectors(selectors).fields.items()}
+        with self._lock:
+            self.counters['cards']=self.counters.get('cards', 0) + len(rows)
+            for label in labels.values():
+                self.missing.setdefault(label, 0)
+            for row in rows:
+                for field, label in labels.items():
+                    if row.get(field) is None:
+                        self.missing[label]+=1
+            for stage, seconds in getattr(rows, 'timings', {}).items():
+                total, count=self.timers.get(stage, (0.0, 0))
+                self.timers[stage]=(total + seconds, count + 1)
+
+    def report(self):
+        with self._lock:
+            return {
+                'started': self.started,
+                'seconds': round(time.time() - self.started, 3),
+                'stages': {stage: {'seconds': round(total, 4), 'count': count}
+                           for stage, (total, count) in sorted(self.timers.items(), key=lambda kv: _stage_order(kv[0]))},
+                'counters': dict(sorted(self.counters.items())),
+                'missing': dict(self.missing),
+            }
+
+
+def _stage_order(stage):
+    return (STAGES.index(stage) if stage in STAGES else len(STAGES), stage)
+
+
+class NullMetrics:
+    enabled=False
+    _timer=nullcontext()
+
+    def observe(self, stage, seconds):
+        pass
+
+    def timer(self, stage):
+        return self._timer
+
+    def add(self, counter, value=1):
+        pass
+
+    def cards(self, rows, selectors=None):
+        pass
+
+    def report(self):
+        return None
+
+
+NULL_METRICS=NullMetrics()
+
+
+def _metric_name(name):
+    return ''.join(ch if ch.isalnum() else '_' for ch in name)
+
+
+def prometheus(report, prefix='scraper'):
+    # a run report in the Prometheus text exposition format
+    lines=[f"# TYPE {prefix}_stage_seconds gauge"]
+    lines+=[f'{prefix}_stage_seconds{{stage="{stage}"}} {values["seconds"]}' for stage, values in report['stages'].items()]
+    lines.append(f"# TYPE {prefix}_stage_calls gauge")
+    lines+=[f'{prefix}_stage_calls{{stage="{stage}"}} {values["count"]}' for stage, values in report['stages'].items()]
+    for counter, value in report['counters'].items():
+        name=f"{prefix}_{_metric_name(counter)}"
+        lines+=[f"# TYPE {name} gauge", f"{name} {value}"]
+    lines.append(f"# TYPE {prefix}_missing_fields gauge")
+    for selector, count in report['missing'].items():
+        field, cls=selector.split(':', 1)
+        lines.append(f'{prefix}_missing_fields{{field="{field}",selector="{cls}"}} {count}')
+    lines.append(f"# TYPE {prefix}_run_seconds gauge")
+    lines.append(f"{prefix}_run_seconds {report['seconds']}")
+    return '\n'.join(lines) + '\n'
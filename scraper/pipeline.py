@@ -0,0 +1,122 @@
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing
+from functools import partial
+import requests
+from scraper.fetch import PageFetchError, page_url
+from scraper.extract import parse_products, parse_raw_products, match_selectors, LayoutChanged
+from scraper.metrics import NULL_METRICS
+
+
+def parse_pool(workers=None):
+    # A process pool of parsers for pipelined_crawl(). The crawler runs
+    # alongside other threads (the Streamlit server, the fetcher's pool), and
+    # a fork() taken while one of them holds a lock can deadlock the child, so
+    # workers come from a forkserver, or are spawned where there is none.
+    method='forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    return ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1,
+                               mp_context=multiprocessing.get_context(method))
+
+
+def pipelined_crawl(fetcher, url, parse=parse_products, workers=None, max_pages=None, pool=None):
+    # Fetched pages go straight onto a process pool of parsers while the
+    # fetcher keeps downloading the next ones. Records are still yielded as
+    # (page, records) in page order, stopping at the first empty page.
+    # parse must be a module-level function so it can be pickled. pool is a
+    # parse_pool() of workers processes shared across crawls; without one a
+    # pool is started for this crawl and shut down after it.
+    workers=workers or os.cpu_count() or 1
+    owned=pool is None
+    if owned:
+        pool=parse_pool(workers)
+    window=workers * 2
+    parsing=deque()
+    try:
+        with closing(fetcher.pages(url, max_pages)) as pages:
+            for page, html in pages:
+                parsing.append((page, pool.submit(parse, html)))
+                while parsing and (parsing[0][1].done() or len(parsing) >= window):
+                    page, future=parsing.popleft()
+                    records=future.result()
+                    if not records:
+                        return
+                    yield page, records
+        while parsing:
+            page, future=parsing.popleft()
+            records=future.result()
+            if not records:
+                return
+            yield page, records
+    finally:
+        if owned:
+            pool.shutdown(wait=False, cancel_futures=True)
+        else:
+            for _, future in parsing:
+                future.cancel()
+
+
+def batch_crawl(fetcher, frontier, parse=parse_raw_products, workers=None, stale_pages=0, metrics=NULL_METRICS,
+                check_layout=True):
+    # Crawls every search in a scraper.frontier.Frontier with one fetcher,
+    # yielding (url, page, records) with only products not seen before.
+    # Every search runs to its last page unless stale_pages is set: then,
+    # once that many pages in a row add nothing new, a search after the
+    # first is taken to have run into results already crawled by an earlier
+    # one and is left early, saving its remaining requests at the cost of
+    # any new products further down; it is listed in frontier.left_early
+    # and counted in metrics. A search whose page fails after retries is recorded in frontier.errors
+    # and the batch moves on to the next one. Every parsed page is counted
+    # in metrics (see scraper.metrics) before deduplication.
+    # With check_layout each search's first page is fingerprinted against the
+    # selector registry first (see scraper.extract.match_selectors): the
+    # search is parsed with the matching set, or dropped into
+    # frontier.errors after that one page when no set matches. parse must
+    # then accept selectors=, as the scraper.extract parse functions do.
+    # one pool of parser processes serves every search in the batch
+    pool=parse_pool(workers) if workers != 0 else None
+    try:
+        for index, url in enumerate(frontier.queries):
+            search_parse=parse
+            search_selectors=None
+            if check_layout:
+                try:
+                    first=fetcher.fetch(page_url(url, 1))
+                    if first:
+                        selectors, _=match_selectors(first)
+                        search_parse=partial(parse, selectors=selectors.version)
+                        search_selectors=selectors
+                except LayoutChanged as e:
+                    metrics.add('layout_aborts')
+                    frontier.errors.append(f"{url} {e}")
+                    continue
+                except requests.RequestException as e:
+                    frontier.errors.append(f"{url} {PageFetchError(1, e)}")
+                    continue
+            if workers == 0:
+                pages=fetcher.crawl(url, search_parse)
+            else:
+                pages=pipelined_crawl(fetcher, url, search_parse, workers=workers, pool=pool)
+            stale=0
+            try:
+                with closing(pages):
+                    for page, records in pages:
+                        metrics.add('pages')
+                        metrics.cards(records, search_selectors)
+                        records=frontier.unseen(records)
+                        if not records:
+                            stale+=1
+                            metrics.add('stale_pages')
+                            if stale_pages and index and stale >= stale_pages:
+                                metrics.add('searches_left_early')
+                                frontier.left_early.append(f"{url} after page {page}")
+                                break
+                            continue
+                        stale=0
+                        yield url, page, records
+            except PageFetchError as e:
+                frontier.errors.append(f"{url} {e}")
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,86 @@
+import os
+import pandas as pd
+from scraper.fetch import ConcurrentFetcher, AdaptiveRateLimiter
+from scraper.extract import parse_raw_products, profile_raw_products
+from scraper.clean import normalize_raw
+from scraper.pipeline import batch_crawl
+from scraper.frontier import Frontier
+from scraper.cache import PageCache
+from scraper.metrics import RunMetrics, NULL_METRICS
+from storage.sinks import SqlSink, HistorySink, CsvSink
+from storage.snapshots import SnapshotSink, SNAPSHOT_DIR
+
+# concurrent page requests and the per-host request rate (requests/second)
+# crawls start at; the limiter is shared by every crawl in this process and
+# adapts the rate to latency and 429/503 responses
+MAX_WORKERS=4
+RATE_PER_HOST=1.0
+LIMITER=AdaptiveRateLimiter(RATE_PER_HOST)
+# parser processes running alongside the fetcher; 0 parses inline
+PARSE_WORKERS=2
+# raw page cache: pages younger than CACHE_TTL seconds are not re-downloaded
+CACHE_DIR='.cache/pages'
+CACHE_TTL=24*3600
+# per-stage timers and counters for each run (scraper.metrics); SCRAPER_METRICS=0 turns them off
+INSTRUMENT=os.getenv('SCRAPER_METRICS', '1') != '0'
+
+
+def run_batch(queries, engine, offline=False, on_page=None, on_flush=None, instrument=INSTRUMENT, csv=None,
+              stale_pages=0):
+    # Crawls several search URLs or keywords through one fetcher and a
+    # shared frontier, so products found by more than one search are cleaned
+    # and written once. Every page is cleaned and merged into
+    # scraped_cleandata as soon as it is parsed, its price/stock changes are
+    # appended to the history table and each search is kept as its own
+    # Parquet snapshot. on_page(page, chunk, summary) is called after each
+    # flush. A search whose page still fails after retries keeps the rows
+    # saved so far, and its message goes into summary['error']. With
+    # instrument, summary['report'] holds the run's RunMetrics report. csv
+    # names a local file every cleaned chunk is also appended to. With
+    # stale_pages, later searches are left after that many pages in a row of
+    # products already found (see scraper.pipeline.batch_crawl).
+    metrics=RunMetrics() if instrument else NULL_METRICS
+    parse=profile_raw_products if instrument else parse_raw_products
+    frontier=Frontier(queries)
+    cache=PageCache(CACHE_DIR, ttl=CACHE_TTL)
+    fetcher=ConcurrentFetcher(max_workers=MAX_WORKERS, cache=cache, offline=offline, limiter=LIMITER,
+                              metrics=metrics)
+    sink=SqlSink(engine, on_flush=on_flush)
+    history=HistorySink(engine)
+    csv_sink=CsvSink(csv) if csv else None
+    snapshots={}
+    summary={'queries': len(frontier.queries), 'query': None, 'pages': 0, 'rows': 0, 'error': None}
+    try:
+        for url, page, records in batch_crawl(fetcher, frontier, parse, workers=PARSE_WORKERS,
+                                              stale_pages=stale_pages, metrics=metrics):
+            if url not in snapshots:
+                snapshots[url]=SnapshotSink(SNAPSHOT_DIR, url)
+            with metrics.timer('clean'):
+                chunk=normalize_raw(pd.DataFrame(records))
+            with metrics.timer('write.history'):
+                history.write(chunk)
+            with metrics.timer('write.sql'):
+                sink.write(chunk)
+            with metrics.timer('write.snapshot'):
+                snapshots[url].write(chunk)
+            if csv_sink:
+                with metrics.timer('write.csv'):
+                    csv_sink.write(chunk)
+            metrics.add('rows', len(chunk))
+            summary.update(query=url, pages=summary['pages'] + 1, rows=sink.rows,
+                           skipped=frontier.skipped_products, report=metrics.report())
+            if on_page:
+                on_page(page, chunk, summary)
+    finally:
+        for snapshot in snapshots.values():
+            snapshot.close()
+        if csv_sink:
+            csv_sink.close()
+        fetcher.client.close()
+        cache.close()
+    summary.update(inserted=sink.inserted, updated=sink.updated, changes=history.appended,
+                   rows_per_sec=sink.rows_per_sec, skipped=frontier.skipped_products,
+                   error='; '.join(frontier.errors) or None, left_early=frontier.left_early,
+                   limiter=LIMITER.metrics(), report=metrics.report())
+    return summary
+
@@ -0,0 +1,88 @@
+import json
+import os
+
+# Flipkart's class names are obfuscated and rotate with every redesign, so
+# the selectors live in a versioned registry (selectors.json at the
+# repository root, or SELECTORS_PATH) listing one set per known layout,
+# newest first. A crawl checks each search's first page against the sets in
+# order and uses the first whose field hit rates clear its min_hit_rate;
+# when none does it stops after that one page.
+SELECTORS_PATH=os.getenv('SELECTORS_PATH', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                                        'selectors.json'))
+
+# (tag, class) of every element the scraper reads. A class string with a space
+# matches the exact class attribute, a single class matches any element that
+# carries it - the same rule BeautifulSoup applies to class_=...
+CONTAINER=('div', 'QSCKDh dLgFEE')
+CARD=('div', 'jIjQ8S')
+FIELDS={
+    'name': ('div', 'RG5Slk'),
+    'price': ('div', 'hZ3P6w DeU9vF'),
+    'rating': ('div', 'MKiFS6'),
+    'discount': ('div', 'HQe8jr'),
+    'stock': ('div', 'HZ0E6r Rm9_cy'),
+    'ratings': ('span', 'PvbNMB'),
+}
+# share of a page's cards that must have each field; rating, discount, stock
+# and ratings are legitimately missing on many products
+MIN_HIT_RATE={'name': 0.9, 'price': 0.9, 'href': 0.9}
+
+
+class SelectorSet:
+    def __init__(self, version, container, card, fields, min_hit_rate=None):
+        unknown=set(fields) - set(FIELDS)
+        if unknown:
+            raise ValueError(f"selector set {version}: unknown fields {sorted(unknown)}")
+        self.version=version
+        self.container=tuple(container)
+        self.card=tuple(card)
+        # a field a layout no longer has is kept, always missing
+        self.fields={field: tuple(fields[field]) if fields.get(field) else None for field in FIELDS}
+        self.min_hit_rate=dict(MIN_HIT_RATE if min_hit_rate is None else min_hit_rate)
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(config['version'], config['container'], config['card'], config['fields'],
+                   config.get('min_hit_rate'))
+
+    def __repr__(self):
+        return f"SelectorSet({self.version!r})"
+
+
+BUILTIN=SelectorSet('builtin', CONTAINER, CARD, FIELDS)
+
+
+def load_registry(path=SELECTORS_PATH):
+    # the configured selector sets, newest first; the built-in set alone
+    # when there is no config file
+    if not os.path.exists(path):
+        return [BUILTIN]
+    with open(path) as f:
+        config=json.load(f)
+    sets=[SelectorSet.from_config(entry) for entry in config['sets']]
+    if not sets:
+        raise ValueError(f"{path} lists no selector sets")
+    return sets
+
+
+_registry=None
+
+
+def registry():
+    global _registry
+    if _registry is None:
+        _registry=load_registry()
+    return _registry
+
+
+def get_selectors(version=None):
+    # a registered set by version; None is the newest
+    if isinstance(version, SelectorSet):
+        return version
+    sets=registry()
+    if version is None:
+        return sets[0]
+    for selectors in sets:
+        if selectors.version == version:
+            return selectors
+    raise KeyError(f"unknown selector set {version!r}")
@@ -0,0 +1,255 @@
+import time
+import uuid
+import weakref
+import pandas as pd
+from sqlalchemy import (MetaData, Table, Column, Integer, BigInteger, Float, Unicode, Index,
+                        inspect, text, select, insert, delete, func, case, cast)
+
+TABLE='scraped_cleandata'
+KEY='product_id'
+
+metadata=MetaData()
+cleandata=Table(
+    TABLE, metadata,
+    Column('record_id', BigInteger, primary_key=True, autoincrement=False),
+    Column('product_id', Unicode(64), nullable=False),
+    Column('product_name', Unicode(500)),
+    Column('brand', Unicode(100)),
+    Column('price', Float),
+    Column('discount', Float),
+    Column('availability', Unicode(50)),
+    Column('rating', Float),
+    Column('number_of_ratings', BigInteger),
+    Index('ux_scraped_cleandata_product_id', 'product_id', unique=True),
+    Index('ix_scraped_cleandata_brand', 'brand'),
+)
+DATA_COLUMNS=[c.name for c in cleandata.columns if c.name != 'record_id']
+
+# Per-brand aggregates of scraped_cleandata, the rows brand_summary() serves.
+# Every write recomputes the rows of the brands it touched inside the same
+# transaction, so the table is never out of step with scraped_cleandata.
+STATS_TABLE='brand_stats'
+IN_STOCK='In Stock'
+brand_stats=Table(
+    STATS_TABLE, metadata,
+    Column('brand', Unicode(100), primary_key=True),
+    Column('products', Integer, nullable=False),
+    Column('avg_price', Float),
+    Column('avg_discount', Float),
+    Column('rating_count', Float),
+    Column('max_ratings', BigInteger),
+    Column('avg_rating', Float),
+    Column('outofstock_percent', Float),
+    # sufficient statistics of rating for the brand ANOVA
+    Column('rating_n', BigInteger),
+    Column('rating_sum', Float),
+    Column('rating_sumsq', Float),
+)
+
+# bind parameters allowed per statement; SQL Server also caps a VALUES list
+# at 1000 rows
+MAX_PARAMS={'mssql': 2100, 'sqlite': 32766}
+MAX_VALUES_ROWS={'mssql': 1000}
+CHUNKSIZE=1000
+
+
+def _records(frame):
+    # DataFrame -> list of dicts with plain Python values and None for NA
+    frame=frame.astype(object).where(frame.notna(), None)
+    return frame.to_dict('records')
+
+
+PLACEHOLDERS={'qmark': '?', 'format': '%s', 'pyformat': '%s'}
+
+
+def bulk_insert(conn, table, rows, chunksize=CHUNKSIZE):
+    # one multi-row INSERT ... VALUES (...), (...) per chunk instead of a
+    # statement per row, sized to stay under the dialect's parameter limit.
+    # The statement text is built once per chunk size and sent straight to
+    # the driver; compiling a 1000-row VALUES clause through SQLAlchemy
+    # costs more than the insert itself.
+    if not rows:
+        return
+    dialect=conn.dialect
+    columns=list(rows[0])
+    size=min(chunksize, MAX_PARAMS.get(dialect.name, 999) // len(columns),
+             MAX_VALUES_ROWS.get(dialect.name, chunksize))
+    size=max(1, size)
+    placeholder=PLACEHOLDERS.get(dialect.paramstyle)
+    if placeholder is None:
+        for start in range(0, len(rows), size):
+            conn.execute(table.insert().values(rows[start:start + size]))
+        return
+
+    quote=dialect.identifier_preparer
+    head=(f"INSERT INTO {quote.format_table(table)} ("
+          + ', '.join(quote.quote(c) for c in columns) + ") VALUES ")
+    row_sql='(' + ', '.join([placeholder] * len(columns)) + ')'
+    statements={}
+    for start in range(0, len(rows), size):
+        chunk=rows[start:start + size]
+        if len(chunk) not in statements:
+            statements[len(chunk)]=head + ', '.join([row_sql] * len(chunk))
+        conn.exec_driver_sql(statements[len(chunk)], tuple(row[c] for row in chunk for c in columns))
+
+
+def _avg(column):
+    return func.avg(cast(column, Float))
+
+
+def refresh_brand_stats(conn, brands=None):
+    # recomputes brand_stats for the given brands (all when None) from
+    # scraped_cleandata, one brand-index range scan per brand
+    c=cleandata.c
+    aggregates=select(
+        c.brand,
+        func.count(),
+        _avg(c.price),
+        _avg(c.discount),
+        _avg(c.number_of_ratings),
+        func.max(c.number_of_ratings),
+        _avg(c.rating),
+        100.0 * func.sum(case((c.availability != IN_STOCK, 1), else_=0)) / func.count(),
+        func.count(c.rating),
+        func.sum(cast(c.rating, Float)),
+        func.sum(cast(c.rating, Float) * cast(c.rating, Float)),
+    ).where(c.brand.isnot(None)).group_by(c.brand)
+    columns=[column.name for column in brand_stats.columns]
+    if brands is None:
+        conn.execute(delete(brand_stats))
+        conn.execute(insert(brand_stats).from_select(columns, aggregates))
+        return
+    brands=sorted(b for b in brands if b is not None)
+    # IN lists stay well under every dialect's parameter limit
+    for start in range(0, len(brands), 500):
+        chunk=brands[start:start + 500]
+        conn.execute(delete(brand_stats).where(brand_stats.c.brand.in_(chunk)))
+        conn.execute(insert(brand_stats).from_select(columns, aggregates.where(c.brand.in_(chunk))))
+
+
+_ready=weakref.WeakSet()
+
+
+def ensure_table(engine):
+    # Creates scraped_cleandata once with real types and indexes. A table left
+    # behind by the old to_sql(if_exists='replace') path is rebuilt in place,
+    # keeping the first record_id seen for each product. brand_stats is
+    # built from whatever scraped_cleandata holds when it is first created.
+    if engine in _ready:
+        return
+    insp=inspect(engine)
+    if not insp.has_table(TABLE):
+        metadata.create_all(engine, tables=[cleandata, brand_stats])
+        _ready.add(engine)
+        return
+    legacy=not any(ix['name'] == 'ux_scraped_cleandata_product_id' for ix in insp.get_indexes(TABLE))
+    with engine.begin() as conn:
+        if legacy:
+            frame=pd.read_sql(text(f"SELECT * FROM {TABLE}"), conn)
+            cleandata.drop(conn)
+            cleandata.create(conn)
+            frame=(frame.dropna(subset=[KEY])
+                        .sort_values('record_id')
+                        .drop_duplicates(subset=[KEY], keep='first'))
+            if not frame.empty:
+                bulk_insert(conn, cleandata, _records(frame[['record_id'] + DATA_COLUMNS]))
+        if legacy or not insp.has_table(STATS_TABLE):
+            brand_stats.create(conn, checkfirst=True)
+            refresh_brand_stats(conn)
+    _ready.add(engine)
+
+
+WRITE_LOCK_TIMEOUT_MS=120_000
+
+
+def lock_writers(conn):
+    # Serialises writers of scraped_cleandata and brand_stats for the rest
+    # of the transaction. New record_ids are numbered from MAX(record_id)
+    # and brand_stats rows are deleted and re-inserted, so two crawler
+    # workers merging at once would otherwise read the same MAX (Azure SQL
+    # reads committed snapshots) and collide on the keys. SQL Server takes
+    # a transaction-owned application lock; SQLite takes its single write
+    # lock up front with a write that touches no rows.
+    if conn.dialect.name == 'mssql':
+        status=conn.execute(text(
+            "DECLARE @status int; EXEC @status = sp_getapplock @Resource = :resource, @LockMode = 'Exclusive',"
+            " @LockOwner = 'Transaction', @LockTimeout = :timeout; SELECT @status"
+        ), {'resource': TABLE, 'timeout': WRITE_LOCK_TIMEOUT_MS}).scalar()
+        if status is None or status < 0:
+            raise TimeoutError(f"could not lock {TABLE} for writing (sp_getapplock returned {status})")
+    elif conn.dialect.name == 'sqlite':
+        conn.execute(delete(brand_stats).where(text('1 = 0')))
+
+
+def _changed(column):
+    t=f"{TABLE}.{column}"
+    return (f"({t} <> s.{column} OR ({t} IS NULL AND s.{column} IS NOT NULL)"
+            f" OR ({t} IS NOT NULL AND s.{column} IS NULL))")
+
+
+def upsert_cleandata(frame, engine, chunksize=CHUNKSIZE):
+    # Merges a cleaned batch into scraped_cleandata keyed on product_id:
+    # the batch is bulk-loaded into a staging table, rows whose values
+    # changed are updated, unseen products are inserted after the current
+    # max(record_id). Existing rows keep their record_id across runs, and an
+    # empty table is bulk-loaded directly. brand_stats is refreshed for the
+    # brands the batch touched. Everything runs in one transaction, which
+    # holds lock_writers() so concurrent crawler workers merge in turn.
+    # Returns a dict of inserted/updated/rows counts and the write rate.
+    start=time.perf_counter()
+    ensure_table(engine)
+    batch=frame.dropna(subset=[KEY]).drop_duplicates(subset=[KEY], keep='last')[DATA_COLUMNS]
+    inserted, updated=0, 0
+    if not batch.empty:
+        rows=_records(batch)
+        brands=set(batch['brand'].dropna())
+        with engine.begin() as conn:
+            lock_writers(conn)
+            if conn.execute(select(cleandata.c.record_id).limit(1)).first() is None:
+                for i, row in enumerate(rows, start=1):
+                    row['record_id']=i
+                bulk_insert(conn, cleandata, rows, chunksize)
+                inserted=len(rows)
+            else:
+                inserted, updated, renamed=_merge(conn, rows, chunksize)
+                brands|=renamed
+            refresh_brand_stats(conn, brands)
+    seconds=time.perf_counter() - start
+    return {'inserted': inserted, 'updated': updated, 'rows': len(batch), 'seconds': seconds,
+            'rows_per_sec': len(batch) / seconds if seconds else 0.0}
+
+
+def _merge(conn, rows, chunksize):
+    stage_name=f"{TABLE}_stage_{uuid.uuid4().hex[:8]}"
+    stage=Table(stage_name, MetaData(),
+                Column('stage_order', Integer, primary_key=True, autoincrement=False),
+                *[Column(c.name, c.type) for c in cleandata.columns if c.name != 'record_id'])
+    for i, row in enumerate(rows):
+        row['stage_order']=i
+
+    columns=', '.join(DATA_COLUMNS)
+    value_columns=[c for c in DATA_COLUMNS if c != KEY]
+    # the staging table is created and dropped inside the caller's
+    # transaction, so a failed merge rolls it back together with the batch
+    stage.create(conn)
+    bulk_insert(conn, stage, rows, chunksize)
+    # brands that lose a product whose name, and so brand, changed
+    renamed=set(conn.execute(text(
+        f"SELECT DISTINCT t.brand FROM {TABLE} AS t JOIN {stage_name} AS s ON t.{KEY} = s.{KEY}"
+        " WHERE t.brand <> s.brand OR (s.brand IS NULL AND t.brand IS NOT NULL)"
+    )).scalars())
+    updated=conn.execute(text(
+        f"UPDATE {TABLE} SET " + ', '.join(f"{c} = s.{c}" for c in value_columns) +
+        f" FROM {stage_name} AS s"
+        f" WHERE {TABLE}.{KEY} = s.{KEY}"
+        " AND (" + ' OR '.join(_changed(c) for c in value_columns) + ")"
+    )).rowcount
+    inserted=conn.execute(text(
+        f"INSERT INTO {TABLE} (record_id, {columns})"
+        f" SELECT (SELECT COALESCE(MAX(record_id), 0) FROM {TABLE})"
+        f" + ROW_NUMBER() OVER (ORDER BY s.stage_order), " + ', '.join(f"s.{c}" for c in DATA_COLUMNS) +
+        f" FROM {stage_name} AS s"
+        f" WHERE NOT EXISTS (SELECT 1 FROM {TABLE} AS t WHERE t.{KEY} = s.{KEY})"
+    )).rowcount
+    stage.drop(conn)
+    return inserted, updated, renamed
@@ -0,0 +1,149 @@
+import threading
+import time
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+# Engine factory shared by the dashboards, the crawler and the benchmarks.
+# Server databases get a bounded QueuePool whose connections are pinged
+# before use and recycled before Azure SQL's gateway drops them as idle,
+# plus login and statement timeouts so a dead connection fails fast instead
+# of stalling a page. A sqlite:/// or duckdb:/// URL gives a local database
+# behind the same interface (duckdb:/// needs the duckdb-engine package).
+# Every engine counts checkouts and the time spent waiting for a connection;
+# pool_metrics(engine) reports them.
+
+POOL_SIZE=5
+MAX_OVERFLOW=10
+POOL_TIMEOUT=30
+# Azure SQL closes connections idle for 30 minutes
+POOL_RECYCLE=1200
+STATEMENT_TIMEOUT=60
+LOGIN_TIMEOUT=15
+LOCAL_BACKENDS={'sqlite', 'duckdb'}
+
+
+class PoolMetrics:
+    def __init__(self):
+        self._lock=threading.Lock()
+        self.connects=0
+        self.checkouts=0
+        self.checked_out=0
+        self.peak_checked_out=0
+        self.invalidated=0
+        self.timeouts=0
+        self.waits=0
+        self.wait_seconds=0.0
+        self.max_wait=0.0
+
+    def add(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def waited(self, seconds, timed_out=False):
+        with self._lock:
+            self.waits+=1
+            self.wait_seconds+=seconds
+            self.max_wait=max(self.max_wait, seconds)
+            self.timeouts+=timed_out
+
+    def checkout(self):
+        with self._lock:
+            self.checkouts+=1
+            self.checked_out+=1
+            self.peak_checked_out=max(self.peak_checked_out, self.checked_out)
+
+    def checkin(self):
+        with self._lock:
+            self.checked_out-=1
+
+    def report(self):
+        with self._lock:
+            return {'connects': self.connects, 'checkouts': self.checkouts, 'checked_out': self.checked_out,
+                    'peak_checked_out': self.peak_checked_out, 'invalidated': self.invalidated,
+                    'timeouts': self.timeouts, 'wait_seconds': round(self.wait_seconds, 4),
+                    'avg_wait': round(self.wait_seconds / self.waits, 4) if self.waits else 0.0,
+                    'max_wait': round(self.max_wait, 4)}
+
+
+class TimedQueuePool(QueuePool):
+    # QueuePool recording how long each checkout waited for a connection.
+    # make_engine() subclasses it per engine with its own metrics, so pools
+    # recreated after a dispose() keep reporting to the same object.
+    metrics=None
+
+    def _do_get(self):
+        start=time.perf_counter()
+        try:
+            connection=super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.waited(time.perf_counter() - start, timed_out=True)
+            raise
+        self.metrics.waited(time.perf_counter() - start)
+        return connection
+
+
+def _connect_args(backend, statement_timeout, login_timeout):
+    if backend == 'mssql':
+        # pymssql: timeout is the per-query timeout in seconds
+        return {'login_timeout': login_timeout, 'timeout': statement_timeout}
+    if backend == 'sqlite':
+        # sqlite has no statement timeout; wait this long on a locked database
+        return {'timeout': statement_timeout, 'check_same_thread': False}
+    return {}
+
+
+def make_engine(url, pool_size=POOL_SIZE, max_overflow=MAX_OVERFLOW, pool_timeout=POOL_TIMEOUT,
+                pool_recycle=POOL_RECYCLE, pre_ping=None, statement_timeout=STATEMENT_TIMEOUT,
+                login_timeout=LOGIN_TIMEOUT, **kwargs):
+    # pre_ping defaults to on for server databases and off for local files
+    url=make_url(url)
+    backend=url.get_backend_name()
+    local=backend in LOCAL_BACKENDS
+    in_memory=backend == 'sqlite' and url.database in (None, '', ':memory:')
+    metrics=PoolMetrics()
+    options={'connect_args': _connect_args(backend, statement_timeout, login_timeout)}
+    if not in_memory:
+        # an in-memory sqlite database lives in its single connection, so it
+        # keeps SQLAlchemy's default pool
+        options.update(poolclass=type('TimedQueuePool', (TimedQueuePool,), {'metrics': metrics}),
+                       pool_size=pool_size, max_overflow=max_overflow, pool_timeout=pool_timeout,
+                       pool_recycle=pool_recycle, pool_pre_ping=not local if pre_ping is None else pre_ping)
+    options.update(kwargs)
+    engine=create_engine(url, **options)
+    engine.pool_metrics=metrics
+
+    @event.listens_for(engine, 'connect')
+    def connect(dbapi_connection, record):
+        metrics.add('connects')
+        if backend == 'sqlite' and not in_memory:
+            # readers no longer block on the crawler's writes
+            cursor=dbapi_connection.cursor()
+            cursor.execute('PRAGMA journal_mode=WAL')
+            cursor.close()
+
+    @event.listens_for(engine, 'checkout')
+    def checkout(dbapi_connection, record, proxy):
+        metrics.checkout()
+
+    @event.listens_for(engine, 'checkin')
+    def checkin(dbapi_connection, record):
+        metrics.checkin()
+
+    @event.listens_for(engine, 'invalidate')
+    def invalidate(dbapi_connection, record, exception):
+        # connections found dead by the pre-ping or dropped mid-query
+        metrics.add('invalidated')
+
+    return engine
+
+
+def pool_metrics(engine):
+    # checkout and wait counters plus the pool's current size and overflow;
+    # engines not built by make_engine() only report the latter
+    metrics=getattr(engine, 'pool_metrics', None)
+    report=metrics.report() if metrics is not None else {}
+    pool=engine.pool
+    if isinstance(pool, QueuePool):
+        report.update(pool_size=pool.size(), overflow=max(0, pool.overflow()), idle=pool.checkedin())
+    return report
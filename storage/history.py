@@ -0,0 +1,108 @@
+import uuid
+import weakref
+from datetime import datetime, timezone
+import pandas as pd
+from sqlalchemy import (MetaData, Table, Column, Integer, SmallInteger, Float, Unicode, DateTime, Index,
+                        select, text, bindparam)
+from storage.cleandata import bulk_insert, _records, cleandata
+
+TABLE='product_history'
+
+# One row per product per run in which its price, discount or stock changed.
+# stock_left is N for "Only N left" and NULL while the product is in stock.
+metadata=MetaData()
+history=Table(
+    TABLE, metadata,
+    Column('product_id', Unicode(64), primary_key=True),
+    Column('observed_at', DateTime, primary_key=True),
+    Column('brand', Unicode(100)),
+    Column('price', Float),
+    Column('discount', Float),
+    Column('stock_left', SmallInteger),
+    Index('ix_product_history_brand_time', 'brand', 'observed_at'),
+)
+TRACKED=['price', 'discount', 'stock_left']
+
+
+_ready=weakref.WeakSet()
+
+
+def ensure_history_table(engine):
+    # creates product_history once per engine
+    if engine in _ready:
+        return
+    metadata.create_all(engine, tables=[history])
+    _ready.add(engine)
+
+
+def observations(frame):
+    # cleaned products -> history columns
+    out=frame[['product_id', 'brand', 'price', 'discount']].copy()
+    out['stock_left']=pd.to_numeric(frame['availability'].astype(str).str.extract(r'Only (\d+) left', expand=False),
+                                   errors='coerce').astype('Int64')
+    return out.dropna(subset=['product_id']).drop_duplicates(subset=['product_id'], keep='last')
+
+
+def _same(column):
+    return f"(h.{column} = s.{column} OR (h.{column} IS NULL AND s.{column} IS NULL))"
+
+
+def append_history(frame, engine, observed_at=None):
+    # Appends an observation for every product in the cleaned frame whose
+    # tracked values differ from its latest stored observation; unchanged
+    # products add nothing. Returns the number of rows appended.
+    ensure_history_table(engine)
+    batch=observations(frame)
+    if batch.empty:
+        return 0
+    observed_at=observed_at or datetime.now(timezone.utc).replace(tzinfo=None)
+
+    stage_name=f"{TABLE}_stage_{uuid.uuid4().hex[:8]}"
+    stage=Table(stage_name, MetaData(),
+                Column('stage_order', Integer, primary_key=True, autoincrement=False),
+                *[Column(c.name, c.type) for c in history.columns if c.name != 'observed_at'])
+    rows=_records(batch)
+    for i, row in enumerate(rows):
+        row['stage_order']=i
+    columns=['product_id', 'brand'] + TRACKED
+    with engine.begin() as conn:
+        stage.create(conn)
+        bulk_insert(conn, stage, rows)
+        appended=conn.execute(text(
+            f"INSERT INTO {TABLE} (observed_at, {', '.join(columns)})"
+            f" SELECT :observed_at, {', '.join('s.' + c for c in columns)} FROM {stage_name} AS s"
+            f" WHERE NOT EXISTS (SELECT 1 FROM {TABLE} AS h WHERE h.product_id = s.product_id"
+            f" AND h.observed_at = (SELECT MAX(l.observed_at) FROM {TABLE} AS l WHERE l.product_id = s.product_id)"
+            " AND " + ' AND '.join(_same(c) for c in TRACKED) + ")"
+        ).bindparams(bindparam('observed_at', type_=DateTime)), {'observed_at': observed_at}).rowcount
+        stage.drop(conn)
+    return appended
+
+
+def _read(engine, query):
+    # a database that has not been crawled since history was added has no
+    # product_history table yet; it reads as no history
+    ensure_history_table(engine)
+    with engine.connect() as conn:
+        return pd.read_sql(query, conn)
+
+
+def history_products(engine, brand):
+    # products of one brand that have history, with their current name
+    h=history.c
+    query=(select(h.product_id, cleandata.c.product_name).distinct()
+           .select_from(history.outerjoin(cleandata, cleandata.c.product_id == h.product_id))
+           .where(h.brand == brand).order_by(cleandata.c.product_name))
+    return _read(engine, query)
+
+
+def product_history(engine, product_ids, start=None, end=None):
+    # observations of the given products, oldest first (primary key seek)
+    h=history.c
+    query=select(history).where(h.product_id.in_(list(product_ids)))
+    if start is not None:
+        query=query.where(h.observed_at >= start)
+    if end is not None:
+        query=query.where(h.observed_at <= end)
+    return _read(engine, query.order_by(h.product_id, h.observed_at))
+
@@ -0,0 +1,130 @@
+import os
+import socket
+import weakref
+from datetime import datetime, timedelta, timezone
+import pandas as pd
+from sqlalchemy import (MetaData, Table, Column, Integer, Boolean, Unicode, UnicodeText, DateTime, Index,
+                        inspect, text, select, update, insert, and_, or_, func)
+
+TABLE='crawl_jobs'
+QUEUED, RUNNING, DONE, FAILED='queued', 'running', 'done', 'failed'
+
+# The crawl queue lives in the database so the web process can submit jobs
+# and show their progress while crawler workers, possibly on another dyno,
+# claim and run them. A batch job holds one search URL or keyword per line
+# of url. A running job's worker refreshes heartbeat_at every HEARTBEAT
+# seconds; once it is older than LEASE the worker is taken for dead (dyno
+# restart, SIGTERM, the web process exiting) and another worker reclaims
+# the job.
+HEARTBEAT=30
+LEASE=timedelta(seconds=5 * HEARTBEAT)
+metadata=MetaData()
+jobs=Table(
+    TABLE, metadata,
+    Column('id', Integer, primary_key=True, autoincrement=True),
+    Column('url', UnicodeText, nullable=False),
+    Column('offline', Boolean, nullable=False, default=False),
+    Column('status', Unicode(16), nullable=False, default=QUEUED),
+    Column('submitted_at', DateTime, nullable=False),
+    Column('started_at', DateTime),
+    Column('finished_at', DateTime),
+    Column('worker', Unicode(100)),
+    Column('heartbeat_at', DateTime),
+    Column('pages', Integer, default=0),
+    Column('products', Integer, default=0),
+    Column('inserted', Integer),
+    Column('updated', Integer),
+    Column('changes', Integer),
+    Column('skipped', Integer),
+    Column('message', Unicode(1000)),
+    # scraper.metrics run report as JSON
+    Column('report', UnicodeText),
+    Index('ix_crawl_jobs_status', 'status', 'id'),
+)
+
+
+def _now():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+_ready=weakref.WeakSet()
+
+
+def ensure_jobs_table(engine):
+    # creates crawl_jobs, adding heartbeat_at to a table from before leases
+    if engine in _ready:
+        return
+    metadata.create_all(engine, tables=[jobs])
+    if 'heartbeat_at' not in {c['name'] for c in inspect(engine).get_columns(TABLE)}:
+        with engine.begin() as conn:
+            column_type=jobs.c.heartbeat_at.type.compile(engine.dialect)
+            conn.execute(text(f"ALTER TABLE {TABLE} ADD heartbeat_at {column_type}"))
+    _ready.add(engine)
+
+
+def _expired():
+    # running jobs whose worker has not been heard from within LEASE
+    return and_(jobs.c.status == RUNNING,
+                func.coalesce(jobs.c.heartbeat_at, jobs.c.started_at) < _now() - LEASE)
+
+
+def submit_job(engine, url, offline=False):
+    # queues a crawl unless the same URL is already queued or running;
+    # returns the job id either way. A running job whose lease expired is
+    # failed and a new one queued in its place.
+    ensure_jobs_table(engine)
+    with engine.begin() as conn:
+        conn.execute(update(jobs).where(jobs.c.url == url, _expired())
+                     .values(status=FAILED, finished_at=_now(), message='worker stopped responding'))
+        active=conn.execute(select(jobs.c.id).where(jobs.c.url == url, jobs.c.status.in_([QUEUED, RUNNING]))
+                            .order_by(jobs.c.id).limit(1)).scalar()
+        if active is not None:
+            return active
+        return conn.execute(insert(jobs).values(url=url, offline=offline, status=QUEUED, submitted_at=_now(),
+                                                pages=0, products=0)).inserted_primary_key[0]
+
+
+def claim_job(engine, worker):
+    # atomically moves the oldest queued job, or a running one whose lease
+    # expired, to running under this worker; None when idle
+    ensure_jobs_table(engine)
+    while True:
+        with engine.begin() as conn:
+            claimable=or_(jobs.c.status == QUEUED, _expired())
+            job_id=conn.execute(select(jobs.c.id).where(claimable).order_by(jobs.c.id).limit(1)).scalar()
+            if job_id is None:
+                return None
+            now=_now()
+            claimed=conn.execute(update(jobs).where(jobs.c.id == job_id, claimable)
+                                 .values(status=RUNNING, started_at=now, heartbeat_at=now, worker=worker)).rowcount
+            if claimed:
+                return dict(conn.execute(select(jobs).where(jobs.c.id == job_id)).mappings().one())
+
+
+def heartbeat(engine, job_id):
+    # renews the running job's lease
+    update_job(engine, job_id, heartbeat_at=_now())
+
+
+def update_job(engine, job_id, **values):
+    if values.get('status') in (DONE, FAILED):
+        values.setdefault('finished_at', _now())
+    with engine.begin() as conn:
+        conn.execute(update(jobs).where(jobs.c.id == job_id).values(**values))
+
+
+def get_job(engine, job_id):
+    with engine.connect() as conn:
+        row=conn.execute(select(jobs).where(jobs.c.id == job_id)).mappings().first()
+    return dict(row) if row else None
+
+
+def recent_jobs(engine, limit=10):
+    ensure_jobs_table(engine)
+    with engine.connect() as conn:
+        columns=[c for c in jobs.columns if c.name != 'report']
+        return pd.read_sql(select(*columns).order_by(jobs.c.id.desc()).limit(limit), conn)
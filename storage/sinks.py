@@ -0,0 +1,63 @@
+import os
+from datetime import datetime, timezone
+from storage.cleandata import upsert_cleandata
+from storage.history import append_history
+
+
+class SqlSink:
+    # merges every cleaned chunk into scraped_cleandata as it arrives
+    def __init__(self, engine, on_flush=None):
+        self.engine=engine
+        self.on_flush=on_flush
+        self.inserted=0
+        self.updated=0
+        self.rows=0
+        self.seconds=0.0
+
+    @property
+    def rows_per_sec(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def write(self, chunk):
+        written=upsert_cleandata(chunk, self.engine)
+        self.inserted+=written['inserted']
+        self.updated+=written['updated']
+        self.rows+=written['rows']
+        self.seconds+=written['seconds']
+        if self.on_flush:
+            self.on_flush()
+
+    def close(self):
+        pass
+
+
+class HistorySink:
+    # appends each chunk's changed prices/stock to product_history, every
+    # observation of the run stamped with the time the run started
+    def __init__(self, engine):
+        self.engine=engine
+        self.observed_at=datetime.now(timezone.utc).replace(tzinfo=None)
+        self.appended=0
+
+    def write(self, chunk):
+        self.appended+=append_history(chunk, self.engine, self.observed_at)
+
+    def close(self):
+        pass
+
+
+class CsvSink:
+    # appends every cleaned chunk to a local CSV file
+    def __init__(self, path):
+        self.path=path
+        self.rows=0
+        self._header=not os.path.exists(path) or os.path.getsize(path) == 0
+
+    def write(self, chunk):
+        chunk.to_csv(self.path, mode='a', header=self._header, index=False)
+        self._header=False
+        self.rows+=len(chunk)
+
+    def close(self):
+        pass
+
@@ -0,0 +1,101 @@
+import os
+import re
+import time
+import uuid
+from datetime import date
+from urllib.parse import urlsplit, parse_qs
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from pyarrow import fs
+
+SNAPSHOT_DIR='snapshots'
+
+# One Parquet file per scrape run, hive-partitioned as
+#   <root>/run_date=YYYY-MM-DD/query=<search slug>/<run_id>.parquet
+# with one zstd-compressed row group per flushed page.
+
+SCHEMA=pa.schema([
+    ('product_id', pa.string()),
+    ('product_name', pa.string()),
+    ('brand', pa.string()),
+    ('price', pa.float64()),
+    ('discount', pa.float64()),
+    ('availability', pa.string()),
+    ('rating', pa.float64()),
+    ('number_of_ratings', pa.int64()),
+])
+PARTITIONING=ds.partitioning(pa.schema([('run_date', pa.string()), ('query', pa.string())]), flavor='hive')
+
+
+def query_slug(url):
+    # "https://www.flipkart.com/search?q=5g%20phones&page=2" -> "5g-phones"
+    query=parse_qs(urlsplit(url).query).get('q', [''])[0] or urlsplit(url).path
+    return re.sub(r'[^a-z0-9]+', '-', query.lower()).strip('-') or 'search'
+
+
+class SnapshotSink:
+    # storage.sinks-style sink writing the run's cleaned chunks to Parquet
+    def __init__(self, root, url, run_date=None):
+        self.run_date=(run_date or date.today()).isoformat()
+        self.query=query_slug(url)
+        self.run_id=f"{time.strftime('%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        directory=os.path.join(root, f"run_date={self.run_date}", f"query={self.query}")
+        os.makedirs(directory, exist_ok=True)
+        self.path=os.path.join(directory, f"{self.run_id}.parquet")
+        # written under a "_" name, which dataset discovery skips, and renamed
+        # once complete so a crashed run never leaves an unreadable file behind
+        self._partial=os.path.join(directory, f"_{self.run_id}.parquet")
+        self.rows=0
+        self._writer=None
+
+    def write(self, chunk):
+        table=pa.Table.from_pandas(chunk[SCHEMA.names], schema=SCHEMA, preserve_index=False)
+        if self._writer is None:
+            self._writer=pq.ParquetWriter(self._partial, SCHEMA, compression='zstd')
+        self._writer.write_table(table)
+        self.rows+=len(chunk)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer=None
+            os.replace(self._partial, self.path)
+
+
+def _dataset(root):
+    # memory-mapped reads: pages are mapped rather than copied into buffers
+    return ds.dataset(root, format='parquet', partitioning=PARTITIONING,
+                      filesystem=fs.LocalFileSystem(use_mmap=True))
+
+
+def list_runs(root=SNAPSHOT_DIR):
+    # [(run_date, query, run_id, path)] newest first
+    if not os.path.isdir(root):
+        return []
+    runs=[]
+    for path in _dataset(os.path.abspath(root)).files:
+        parts=dict(p.split('=', 1) for p in path.split(os.sep) if '=' in p)
+        runs.append((parts.get('run_date'), parts.get('query'), os.path.basename(path)[:-len('.parquet')], path))
+    return sorted(runs, reverse=True)
+
+
+def load_snapshot(root=SNAPSHOT_DIR, run_date=None, query=None, run_id=None, brands=None, columns=None):
+    # reads matching runs; partitions and the brand filter are pushed down,
+    # so only the needed files, row groups and columns are decoded
+    dataset=_dataset(os.path.abspath(root))
+    condition=None
+    for expression in [
+        ds.field('run_date') == run_date if run_date else None,
+        ds.field('query') == query if query else None,
+        ds.field('brand').isin(list(brands)) if brands else None,
+    ]:
+        if expression is not None:
+            condition=expression if condition is None else condition & expression
+    if run_id:
+        dataset=ds.dataset([f for f in dataset.files if os.path.basename(f) == f"{run_id}.parquet"],
+                           format='parquet', partitioning=PARTITIONING,
+                           partition_base_dir=os.path.abspath(root),
+                           filesystem=fs.LocalFileSystem(use_mmap=True))
+    table=dataset.to_table(columns=list(columns) if columns else SCHEMA.names, filter=condition)
+    return table.to_pandas()
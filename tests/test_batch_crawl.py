@@ -0,0 +1,62 @@
+# Stale-page early exit: with stale_pages set, later searches that only repeat
+# earlier results are left early and reported, the first search always runs
+# to its last page.
+from benchmarks.fixtures import FixtureServer
+from scraper.extract import parse_raw_products
+from scraper.fetch import ConcurrentFetcher
+from scraper.frontier import Frontier, product_key
+from scraper.metrics import RunMetrics
+import scraper.pipeline
+from scraper.pipeline import batch_crawl
+
+
+def test_only_later_searches_leave_early():
+    with FixtureServer(last_page=5, latency=0) as server:
+        fetcher=ConcurrentFetcher(max_workers=2, rate=100)
+        # the second search returns the same products as the first
+        frontier=Frontier([server.url, server.url.replace('q=mobiles', 'q=phones')])
+        # and the first search's opening pages were already seen, as with
+        # promoted cards repeated across pages
+        for page in (1, 2):
+            html=fetcher.fetch(f"{server.url}&page={page}")
+            for record in parse_raw_products(html):
+                frontier.products.add(product_key(record))
+        metrics=RunMetrics()
+        pages=[(url, page) for url, page, _ in
+               batch_crawl(fetcher, frontier, workers=0, stale_pages=2, metrics=metrics)]
+        fetcher.client.close()
+    first, second=frontier.queries
+    assert pages == [(first, 3), (first, 4), (first, 5)]
+    assert frontier.left_early == [f"{second} after page 2"]
+    assert metrics.counters['searches_left_early'] == 1
+    assert metrics.counters['stale_pages'] == 4
+
+
+def test_searches_share_one_parser_pool(monkeypatch):
+    # every search of a batch parses on the same process pool
+    real=scraper.pipeline.parse_pool
+    pools=[]
+
+    def parse_pool(workers=None):
+        pools.append(real(workers))
+        return pools[-1]
+    monkeypatch.setattr(scraper.pipeline, 'parse_pool', parse_pool)
+    with FixtureServer(last_page=3, latency=0) as server:
+        fetcher=ConcurrentFetcher(max_workers=2, rate=100)
+        frontier=Frontier([server.url.replace('q=mobiles', f"q={q}") for q in ('mobiles', 'phones', 'tablets')])
+        pages=list(batch_crawl(fetcher, frontier, workers=1))
+        fetcher.client.close()
+    assert len(pools) == 1
+    assert len(pages) == 3
+
+
+def test_searches_run_to_their_last_page_by_default():
+    with FixtureServer(last_page=4, latency=0) as server:
+        fetcher=ConcurrentFetcher(max_workers=2, rate=100)
+        frontier=Frontier([server.url, server.url.replace('q=mobiles', 'q=phones')])
+        metrics=RunMetrics()
+        list(batch_crawl(fetcher, frontier, workers=0, metrics=metrics))
+        fetcher.client.close()
+    assert frontier.left_early == []
+    assert metrics.counters['pages'] == 8
+    assert metrics.counters['stale_pages'] == 4
@@ -0,0 +1,27 @@
+# normalize_raw() against the per-card build_record() and clean_products()
+# it replaced, on the recorded result pages (benchmarks/corpus) or the
+# synthetic ones when none are recorded, and on raw rows with the usual
+# missing fields.
+import pandas as pd
+from benchmarks.fixtures import load_corpus, raw_frame
+from scraper.clean import clean_products, normalize_raw
+from scraper.extract import build_record, parse_raw_products
+
+
+def per_card(rows):
+    return clean_products(pd.DataFrame([build_record(row, row['href']) for row in rows]))
+
+
+def assert_same_frame(left, right):
+    # same values; the two paths type text and whole prices differently
+    pd.testing.assert_frame_equal(left.reset_index(drop=True), right.reset_index(drop=True), check_dtype=False)
+
+
+def test_normalize_raw_matches_per_card_cleaning():
+    rows=[row for html in load_corpus(10) for row in parse_raw_products(html)]
+    assert_same_frame(normalize_raw(pd.DataFrame(rows)), per_card(rows))
+
+
+def test_normalize_raw_matches_per_card_cleaning_with_missing_fields():
+    raw=raw_frame(2_000)
+    assert_same_frame(normalize_raw(raw), per_card(raw.astype(object).where(raw.notna(), None).to_dict('records')))
@@ -0,0 +1,73 @@
+# Merging cleaned batches into scraped_cleandata on SQLite: record_ids are
+# stable across runs, new products are numbered after the current maximum,
+# and brand_stats follows the merged table.
+import pandas as pd
+import pytest
+from sqlalchemy import select
+from storage.cleandata import cleandata, brand_stats, bulk_insert, upsert_cleandata, IN_STOCK
+from storage.engine import make_engine
+
+
+def products(ids, brand='Apple', price=100.0):
+    return pd.DataFrame([{'product_id': f"p{i}", 'product_name': f"{brand} phone {i}", 'brand': brand,
+                          'price': price + i, 'discount': 10.0, 'availability': IN_STOCK if i % 3 else 'Out of Stock',
+                          'rating': 4.0 + i % 5 / 10 if i % 4 else None, 'number_of_ratings': 10 * i}
+                         for i in ids])
+
+
+def table(engine, source=cleandata, order='record_id'):
+    with engine.connect() as conn:
+        return pd.read_sql(select(source).order_by(source.c[order]), conn)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine=make_engine(f"sqlite:///{tmp_path / 'products.db'}")
+    yield engine
+    engine.dispose()
+
+
+def test_first_load_numbers_record_ids_from_one(engine):
+    result=upsert_cleandata(products(range(5)), engine)
+    assert (result['inserted'], result['updated'], result['rows']) == (5, 0, 5)
+    loaded=table(engine)
+    assert loaded['record_id'].tolist() == [1, 2, 3, 4, 5]
+    assert loaded['product_id'].tolist() == [f"p{i}" for i in range(5)]
+
+
+def test_merge_keeps_record_ids_and_numbers_new_rows_after_the_max(engine):
+    upsert_cleandata(products(range(5)), engine)
+    before=table(engine).set_index('product_id')['record_id']
+    # p1 and p3 change price, p2 and p4 are unchanged, p5 and p6 are new
+    batch=pd.concat([products([2, 4]), products([1, 3], price=50.0), products([6, 5])])
+    result=upsert_cleandata(batch, engine)
+    assert (result['inserted'], result['updated'], result['rows']) == (2, 2, 6)
+    after=table(engine).set_index('product_id')
+    assert (after['record_id'][before.index] == before).all()
+    # new products follow the batch order
+    assert after['record_id']['p6'] == 6 and after['record_id']['p5'] == 7
+    assert after['price']['p1'] == 51.0 and after['price']['p2'] == 102.0
+
+
+def test_brand_stats_match_groupby_after_a_brand_rename(engine):
+    upsert_cleandata(pd.concat([products(range(6)), products(range(6, 10), brand='Samsung')]), engine)
+    # two Apple products turn out to be Samsung ones
+    upsert_cleandata(products([1, 4], brand='Samsung'), engine)
+    merged=table(engine)
+    assert merged.loc[merged['product_id'].isin(['p1', 'p4']), 'brand'].eq('Samsung').all()
+    expected=merged.groupby('brand').agg(products=('product_id', 'size'), avg_price=('price', 'mean'),
+                                         max_ratings=('number_of_ratings', 'max'), avg_rating=('rating', 'mean'),
+                                         rating_n=('rating', 'count'))
+    expected['outofstock_percent']=merged.groupby('brand')['availability'].apply(lambda a: 100 * (a != IN_STOCK).mean())
+    stats=table(engine, brand_stats, 'brand').set_index('brand')
+    pd.testing.assert_frame_equal(stats[expected.columns], expected, check_dtype=False)
+
+
+def test_bulk_insert_in_chunks(engine):
+    upsert_cleandata(products([0]), engine)
+    rows=[{'record_id': i, 'product_id': f"q{i}", 'brand': 'Nokia'} for i in range(10, 35)]
+    with engine.begin() as conn:
+        bulk_insert(conn, cleandata, rows, chunksize=7)
+    loaded=table(engine)
+    assert loaded['record_id'].tolist() == [1] + list(range(10, 35))
+    assert loaded['product_id'].tolist()[1:] == [row['product_id'] for row in rows]
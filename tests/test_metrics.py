@@ -0,0 +1,18 @@
+# Missing-field counts are labelled with the classes of the selector set
+# that parsed the cards, not the built-in ones.
+from scraper.metrics import RunMetrics, prometheus
+from scraper.selectors import BUILTIN, FIELDS, SelectorSet
+
+
+def test_missing_fields_use_the_parsing_sets_classes():
+    renamed=SelectorSet('renamed', BUILTIN.container, BUILTIN.card,
+                        {field: (tag, f"new-{cls}") for field, (tag, cls) in FIELDS.items() if field != 'rating'})
+    row=dict.fromkeys(FIELDS, 'x')
+    metrics=RunMetrics()
+    metrics.cards([dict(row, price=None)], BUILTIN)
+    metrics.cards([dict(row, price=None, rating=None)], renamed)
+    missing=metrics.report()['missing']
+    assert missing[f"price:{FIELDS['price'][1]}"] == 1
+    assert missing[f"price:new-{FIELDS['price'][1]}"] == 1
+    assert missing['rating:'] == 1
+    assert f'field="price",selector="new-{FIELDS["price"][1]}"' in prometheus(metrics.report())
@@ -0,0 +1,39 @@
+# Replaying a search offline past the pages an earlier online crawl cached
+# ends the crawl at the first uncached page instead of failing on it.
+import pytest
+from benchmarks.fixtures import FixtureServer
+from scraper.cache import PageCache
+from scraper.extract import parse_raw_products
+from scraper.fetch import ConcurrentFetcher
+from scraper.pipeline import pipelined_crawl
+
+
+@pytest.fixture
+def cached_search(tmp_path):
+    # a 5-page search of which only the first 2 pages were crawled online
+    cache=PageCache(str(tmp_path / 'pages'))
+    with FixtureServer(last_page=5, latency=0) as server:
+        online=ConcurrentFetcher(max_workers=2, rate=100, cache=cache)
+        pages=[page for page, _ in online.crawl(server.url, parse_raw_products, max_pages=2)]
+        url=server.url
+    assert pages == [1, 2]
+    yield url, ConcurrentFetcher(max_workers=2, cache=cache, offline=True)
+    cache.close()
+
+
+def test_crawl_stops_at_first_uncached_page(cached_search):
+    url, offline=cached_search
+    assert offline.fetch(url.replace('q=mobiles', 'q=unknown')) is None
+    assert [page for page, _ in offline.crawl(url, parse_raw_products)] == [1, 2]
+
+
+def test_pipelined_crawl_stops_at_first_uncached_page(cached_search):
+    url, offline=cached_search
+    pages=[(page, len(records)) for page, records in pipelined_crawl(offline, url, parse_raw_products, workers=1)]
+    assert [page for page, _ in pages] == [1, 2] and all(n for _, n in pages)
+
+
+@pytest.mark.parametrize('backend', ['bs4', 'lxml'])
+def test_empty_page_has_no_cards(backend):
+    assert parse_raw_products('', backend) == []
+    assert parse_raw_products('  \n', backend) == []
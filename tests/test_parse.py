@@ -0,0 +1,16 @@
+# The single-pass lxml backend against BeautifulSoup on the recorded result
+# pages (benchmarks/corpus), or the synthetic ones when none are recorded.
+import pytest
+from benchmarks.fixtures import load_corpus
+from scraper.extract import parse_products
+
+PAGES=load_corpus(10)
+
+
+@pytest.mark.parametrize('page', range(len(PAGES)))
+def test_lxml_matches_bs4(page):
+    pytest.importorskip('lxml')
+    html=PAGES[page]
+    records=parse_products(html, backend='lxml')
+    assert records
+    assert records == parse_products(html, backend='bs4')
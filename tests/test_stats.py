@@ -0,0 +1,61 @@
+# The dashboards' ANOVA and t-test from sufficient statistics agree with
+# scipy on the raw rows of a SQLite table, including a brand with a single
+# product and products with no brand or availability.
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats as scipy_stats
+from dashboards import data, stats
+from storage.cleandata import upsert_cleandata, IN_STOCK
+from storage.engine import make_engine
+
+
+@pytest.fixture
+def products(tmp_path, monkeypatch):
+    rng=np.random.default_rng(7)
+    brands=['Apple'] * 12 + ['Samsung'] * 15 + ['Nokia'] * 9 + ['Solo'] + [None] * 4
+    frame=pd.DataFrame({
+        'product_id': [f"p{i}" for i in range(len(brands))],
+        'product_name': [f"phone {i}" for i in range(len(brands))],
+        'brand': brands,
+        'price': rng.uniform(5_000, 80_000, len(brands)).round(),
+        'discount': rng.uniform(0, 40, len(brands)).round(),
+        'availability': rng.choice([IN_STOCK, 'Out of Stock', 'Coming Soon'], len(brands)),
+        'rating': rng.uniform(3, 5, len(brands)).round(1),
+        'number_of_ratings': rng.integers(0, 5_000, len(brands)),
+    })
+    frame.loc[[3, 20], 'rating']=None
+    frame.loc[[5, 30], 'availability']=None
+    engine=make_engine(f"sqlite:///{tmp_path / 'products.db'}")
+    upsert_cleandata(frame, engine)
+    monkeypatch.setattr(data, 'get_engine', lambda: engine)
+    monkeypatch.setattr(stats, 'get_engine', lambda: engine)
+    data.invalidate()
+    data.RESULTS.clear()
+    yield frame
+    data.invalidate()
+    data.RESULTS.clear()
+    engine.dispose()
+
+
+@pytest.mark.parametrize('column, by', [('rating', 'brand'), ('price', 'brand'), ('discount', 'availability')])
+def test_anova_matches_f_oneway(products, column, by):
+    groups=[group[column].dropna() for _, group in products.dropna(subset=[by]).groupby(by)]
+    expected=scipy_stats.f_oneway(*[g for g in groups if len(g)])
+    assert stats.anova(column, by) == pytest.approx((expected.statistic, expected.pvalue))
+
+
+def test_anova_on_a_brand_filter(products):
+    chosen=['Apple', 'Solo', 'Nokia']
+    groups=[products.loc[products['brand'] == brand, 'rating'].dropna() for brand in chosen]
+    expected=scipy_stats.f_oneway(*groups)
+    assert stats.anova('rating', 'brand', brands=chosen) == pytest.approx((expected.statistic, expected.pvalue))
+
+
+@pytest.mark.parametrize('column', ['rating', 'price', 'discount'])
+def test_stock_ttest_matches_ttest_ind(products, column):
+    known=products.dropna(subset=['availability'])
+    in_stock=known.loc[known['availability'] == IN_STOCK, column].dropna()
+    out_stock=known.loc[known['availability'] != IN_STOCK, column].dropna()
+    expected=scipy_stats.ttest_ind(in_stock, out_stock)
+    assert stats.stock_ttest(column) == pytest.approx((expected.statistic, expected.pvalue))
@@ -0,0 +1,15 @@
+# The adaptive limiter against a server that throttles above 5 requests/s:
+# it settles within one step of that rate, stops drawing 429s once it has
+# cut its rate, and every page is still fetched.
+from benchmarks.bench_throttle import run
+
+
+def test_adaptive_rate_settles_below_the_servers_limit():
+    fast, _, adaptive=run(pages=20, allowed_rate=5.0, start_rate=20.0, workers=8)
+    assert fast['pages'] == adaptive['pages'] == 20
+    assert adaptive['limiter'].startswith('adaptive')
+    # additive increase probes one step (5% of the start rate) past the
+    # limit before the next 429 halves the rate again
+    assert 0 < adaptive['final_rate'] <= 5.0 + 20.0 * 0.05
+    # a fixed 20/s keeps being throttled; the adaptive limiter mostly does not
+    assert adaptive['late_429s'] * 2 < fast['late_429s']